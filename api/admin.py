@@ -1,3 +1,289 @@
+"""
+Admin for the finance models, set up for tables with tens of millions of rows:
+
+- no ``COUNT(*)`` of large results: pagination uses PostgreSQL's row estimate
+  (api/counts.py) and the "N total" link is disabled (``show_full_result_count``);
+- related rows for the page come in the same query (``list_select_related``) and
+  foreign keys are edited as raw ids instead of ``<select>``s of every row;
+- search only does exact matches on indexed columns (a UUID also matches the id),
+  never ``LIKE '%term%'`` scans;
+- list filters are choices, booleans and month/year ranges on indexed timestamps
+  (``PeriodFilter``) instead of ``SELECT DISTINCT`` over the table;
+- with DB_SHARDS, sharded models get a shard filter (default: ``default``).
+
+Ledger rows (transactions, expenses, alerts) and balances are read-only here: writes go
+through the API, which keeps balances, project counters and alert counters in step.
+Categories and projects can be edited; those writes bump the owner's DataVersion (not
+the staff user's) so ETags and event streams see them, and deleting a project takes its
+alerts off the owner's alert counters, as the API does.
+"""
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.forms import UserCreationForm
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.http import QueryDict
+
+from . import events, sharding
+from .models import (AlertCounter, BudgetAlert, Category, DataVersion, Expense, MainAccount, Project,
+                     Transaction, User)
+from .pagination import ApproximateCountPaginator
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """Which shard's rows to list; "All" is the ``default`` shard"""
+    title = "shard"
+    parameter_name = "shard"
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in sharding.shards() if alias != sharding.DEFAULT_DB]
+
+    def choices(self, changelist):
+        choices = super().choices(changelist)
+        yield {**next(choices), "display": sharding.DEFAULT_DB}
+        yield from choices
+
+    def queryset(self, request, queryset):
+        # Bound explicitly: the page is fetched while rendering, after the view returned
+        return queryset.using(self.value()) if self.value() else queryset
+
+
+class PeriodFilter(admin.SimpleListFilter):
+    """Month (the last twelve) or year ranges on ``field_name``.
+
+    Half-open UTC ranges, so they use the timestamp index and, for transactions, only
+    scan the matching monthly partitions; the choices come from the MIN and MAX of the
+    column, not from a ``DISTINCT`` scan like ``date_hierarchy``.
+    """
+    title = "period"
+    parameter_name = "period"
+    field_name = None
+    months = 12
+
+    @classmethod
+    def on(cls, field_name):
+        return type(f"{field_name.title()}PeriodFilter", (cls,), {"field_name": field_name})
+
+    def lookups(self, request, model_admin):
+        bounds = model_admin.get_queryset(request).aggregate(
+            first=Min(self.field_name), last=Max(self.field_name))
+        if bounds["last"] is None:
+            return []
+        first, last = (value.astimezone(dt_timezone.utc) for value in (bounds["first"], bounds["last"]))
+        choices = []
+        year, month = last.year, last.month
+        for _ in range(self.months):
+            if (year, month) < (first.year, first.month):
+                return choices
+            choices.append((f"{year}-{month:02d}", f"{year}-{month:02d}"))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        # Whole years for anything older
+        for older in range(year, first.year - 1, -1):
+            choices.append((str(older), str(older)))
+        return choices
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            parts = [int(part) for part in self.value().split("-")]
+            if len(parts) == 2:
+                year, month = parts
+                start = datetime(year, month, 1, tzinfo=dt_timezone.utc)
+                end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+            else:
+                (year,) = parts
+                start = datetime(year, 1, 1, tzinfo=dt_timezone.utc)
+                end = datetime(year + 1, 1, 1, tzinfo=dt_timezone.utc)
+        except ValueError:
+            raise IncorrectLookupParameters(f"Invalid period {self.value()!r}")
+        return queryset.filter(**{f"{self.field_name}__gte": start, f"{self.field_name}__lt": end})
+
+
+class LargeTableMixin:
+    """Changelist defaults for tables too big to count or scan"""
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_list_filter(self, request):
+        list_filter = list(super().get_list_filter(request))
+        if sharding.is_sharded() and self.opts.label_lower in sharding.SHARDED_LABELS:
+            list_filter.append(ShardFilter)
+        return list_filter
+
+    def get_search_results(self, request, queryset, search_term):
+        # A UUID is an id: one primary key lookup instead of the search fields
+        try:
+            return queryset.filter(pk=uuid.UUID(search_term.strip())), False
+        except ValueError:
+            return super().get_search_results(request, queryset, search_term)
+
+    def _shard(self, request):
+        """``?shard=``, also carried to change pages in ``_changelist_filters``"""
+        alias = request.GET.get(ShardFilter.parameter_name)
+        if alias is None:
+            filters = QueryDict(request.GET.get("_changelist_filters", ""))
+            alias = filters.get(ShardFilter.parameter_name)
+        if alias in sharding.shards() and self.opts.label_lower in sharding.SHARDED_LABELS:
+            return alias
+        return None
+
+    def changelist_view(self, request, extra_context=None):
+        with sharding.use_shard(self._shard(request)):
+            return super().changelist_view(request, extra_context)
+
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        with sharding.use_shard(self._shard(request)):
+            return super().changeform_view(request, object_id, form_url, extra_context)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        with sharding.use_shard(self._shard(request)):
+            return super().delete_view(request, object_id, extra_context)
+
+    def history_view(self, request, object_id, extra_context=None):
+        with sharding.use_shard(self._shard(request)):
+            return super().history_view(request, object_id, extra_context)
+
+
+class LargeTableAdmin(LargeTableMixin, admin.ModelAdmin):
+    pass
+
+
+class ReadOnlyAdmin(LargeTableAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class OwnedAdmin(LargeTableAdmin):
+    """Rows belonging to a user; writes are accounted to that user, not the staff member"""
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly_fields = tuple(super().get_readonly_fields(request, obj))
+        # Another user's rows live in their ledger and on their shard
+        return readonly_fields + ("user",) if obj is not None else readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic(using=sharding.active_db()):
+            super().save_model(request, obj, form, change)
+            DataVersion.bump(obj.user_id)
+        events.broker.notify(obj.user_id)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, self.get_queryset(request).filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic(using=sharding.active_db()):
+            owners = set(queryset.values_list("user_id", flat=True))
+            super().delete_queryset(request, queryset)
+            for user_id in owners:
+                DataVersion.bump(user_id)
+        for user_id in owners:
+            events.broker.notify(user_id)
+
+
+class FinanceUserCreationForm(UserCreationForm):
+    class Meta(UserCreationForm.Meta):
+        model = User
+        fields = ("username", "email")
+
+
+@admin.register(User)
+class FinanceUserAdmin(LargeTableMixin, UserAdmin):
+    add_form = FinanceUserCreationForm
+    add_fieldsets = ((None, {"classes": ("wide",), "fields": ("username", "email", "password1", "password2")}),)
+    list_display = ("username", "email", "shard", "is_staff", "is_active", "date_joined")
+    list_filter = ("is_staff", "is_superuser", "is_active")
+    search_fields = ("username__exact", "email__exact")
+    # Changing it would not move the user's data: use `manage.py rebalance_shards --user`
+    readonly_fields = ("shard",)
+    fieldsets = UserAdmin.fieldsets + (("Sharding", {"fields": ("shard",)}),)
+
+
+@admin.register(MainAccount)
+class MainAccountAdmin(LargeTableAdmin):
+    list_display = ("user", "balance", "currency")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("user__username__exact",)
+    readonly_fields = ("balance", "currency")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Category)
+class CategoryAdmin(OwnedAdmin):
+    list_display = ("name", "user", "type", "color", "updated_at")
+    list_select_related = ("user",)
+    list_filter = ("type",)
+    raw_id_fields = ("user",)
+    search_fields = ("user__username__exact",)
+
+
+@admin.register(Project)
+class ProjectAdmin(OwnedAdmin):
+    list_display = ("name", "user", "budget", "budget_limit", "currency", "total_spent", "expense_count",
+                    "updated_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("user__username__exact",)
+    readonly_fields = ("budget", "currency", "total_spent", "total_allocated", "expense_count",
+                       "created_at", "updated_at")
+
+    def get_deleted_objects(self, objs, request):
+        # Expenses, alerts etc. are read-only here, but go with their project, as through the API
+        deleted_objects, model_count, perms_needed, protected = super().get_deleted_objects(objs, request)
+        return deleted_objects, model_count, set(), protected
+
+    def delete_queryset(self, request, queryset):
+        # The projects' alerts are cascade-deleted; take them off their owners' counters
+        with transaction.atomic(using=sharding.active_db()):
+            alerts = list(BudgetAlert.objects.filter(project__in=queryset).order_by().values("user_id").annotate(
+                total=Count("id"), unread=Count("id", filter=Q(is_read=False))))
+            super().delete_queryset(request, queryset)
+            for counts in alerts:
+                AlertCounter.adjust(counts["user_id"], unread=-counts["unread"], total=-counts["total"])
+
+
+@admin.register(Expense)
+class ExpenseAdmin(ReadOnlyAdmin):
+    list_display = ("created_at", "project", "category", "amount", "currency", "description")
+    list_select_related = ("project__user", "category__user")
+    list_filter = (PeriodFilter.on("created_at"),)
+    raw_id_fields = ("project", "category")
+    search_fields = ("project__user__username__exact",)
+    ordering = ("-created_at",)
+
+
+@admin.register(Transaction)
+class TransactionAdmin(ReadOnlyAdmin):
+    list_display = ("timestamp", "transaction_type", "user", "amount", "currency", "project",
+                    "description")
+    list_select_related = ("user", "project__user")
+    list_filter = ("transaction_type", PeriodFilter.on("timestamp"))
+    raw_id_fields = ("user", "project", "main_account", "from_project", "to_project")
+    search_fields = ("user__username__exact",)
+    ordering = ("-timestamp",)
+
 
-# Register your models here.
+@admin.register(BudgetAlert)
+class BudgetAlertAdmin(ReadOnlyAdmin):
+    list_display = ("created_at", "alert_type", "user", "project", "is_read", "message")
+    list_select_related = ("user", "project__user")
+    list_filter = ("alert_type", "is_read", PeriodFilter.on("created_at"))
+    raw_id_fields = ("user", "project")
+    search_fields = ("user__username__exact",)
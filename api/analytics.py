@@ -0,0 +1,93 @@
+"""
+Time-bucket helpers for the reporting endpoints: database truncation per
+granularity, dense (zero-filled) bucket arrays and rolling averages.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.db.models import DateField
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+GRANULARITIES = {
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+# Default rolling-average window (in buckets) per granularity
+DEFAULT_WINDOWS = {"day": 7, "week": 4, "month": 3}
+
+CENTS = Decimal("0.01")
+
+
+def truncate(field, granularity):
+    """Database expression truncating ``field`` to the start of its bucket (as a date)"""
+    return GRANULARITIES[granularity](field, output_field=DateField())
+
+
+def bucket_start(day, granularity):
+    """Python mirror of ``truncate`` for a single date"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == "week":
+        return day + timedelta(days=7)
+    if granularity == "month":
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_range(start_date, end_date, granularity):
+    """Every bucket start between two dates (inclusive), so series can be zero-filled"""
+    buckets = []
+    day = bucket_start(start_date, granularity)
+    while day <= end_date:
+        buckets.append(day)
+        day = next_bucket(day, granularity)
+    return buckets
+
+
+def rolling_average(values, window):
+    """Trailing mean over ``window`` buckets via one prefix-sum pass (shorter at the start)"""
+    prefix = [Decimal(0), *accumulate(values)]
+    return [
+        ((prefix[i] - prefix[max(0, i - window)]) / min(i, window)).quantize(CENTS)
+        for i in range(1, len(prefix))
+    ]
+
+
+def linear_trend(n, sum_y, sum_xy):
+    """Least-squares ``(intercept, slope)`` of y over x = 0..n-1 from running sums.
+
+    Empty buckets have y = 0 and add nothing to the sums, so sparse rows are enough.
+    """
+    if n < 2:
+        return (Decimal(sum_y), Decimal(0))
+    sum_x = Decimal(n * (n - 1) // 2)
+    sum_xx = Decimal((n - 1) * n * (2 * n - 1) // 6)
+    slope = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x * sum_x)
+    intercept = (sum_y - slope * sum_x) / n
+    return (intercept, slope)
+
+
+def days_until_spent(budget, rate, slope):
+    """Days until spending ``rate`` per day, changing by ``slope`` per day, adds up to ``budget``.
+
+    Solves ``rate * t + slope * t**2 / 2 = budget`` for the first t >= 0; None when the
+    spending stops (a falling trend reaching zero) before the budget is used up.
+    """
+    if budget <= 0:
+        return Decimal(0)
+    if slope == 0:
+        return budget / rate if rate > 0 else None
+    discriminant = rate * rate + 2 * slope * budget
+    if discriminant < 0:
+        return None
+    days = (discriminant.sqrt() - rate) / slope
+    return days if days >= 0 else None
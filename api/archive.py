@@ -0,0 +1,178 @@
+"""
+Cold storage for old transactions: one gzipped JSONL file per user and month under
+``settings.TRANSACTION_ARCHIVE_ROOT``, indexed by TransactionArchive rows, plus the
+read-through used by history and point-in-time balance queries.
+
+Archived rows keep the ``.values()`` shape TransactionSerializer's fast path reads,
+so they format exactly like live rows.
+"""
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime, time, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+
+from . import ledger
+from .models import TransactionArchive
+
+FIELDS = (
+    "id", "user", "main_account", "project", "from_project", "to_project",
+    "transaction_type", "amount", "currency", "counter_amount", "description", "reference_id", "timestamp",
+    "project__name", "from_project__name", "to_project__name",
+)
+UUID_FIELDS = ("id", "user", "main_account", "project", "from_project", "to_project")
+
+
+def root():
+    return Path(settings.TRANSACTION_ARCHIVE_ROOT)
+
+
+def month_bounds(month):
+    """``[start, end)`` datetimes (UTC) of the month starting on date ``month``"""
+    start = datetime.combine(month, time.min, tzinfo=dt_timezone.utc)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+
+def _encode(row):
+    return json.dumps({
+        key: value if value is None or isinstance(value, str)
+        else value.isoformat() if isinstance(value, datetime) else str(value)
+        for key, value in row.items()
+    })
+
+
+def _decode(line):
+    row = json.loads(line)
+    for key in UUID_FIELDS:
+        if row[key] is not None:
+            row[key] = uuid.UUID(row[key])
+    row["amount"] = Decimal(row["amount"])
+    # Files written before multi-currency support: every amount was in the default currency
+    row.setdefault("currency", settings.DEFAULT_CURRENCY)
+    counter_amount = row.setdefault("counter_amount", None)
+    if counter_amount is not None:
+        row["counter_amount"] = Decimal(counter_amount)
+    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+def read(archive):
+    """Rows of one archive file, oldest first"""
+    with gzip.open(root() / archive.path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield _decode(line)
+
+
+def write(user_id, month, rows):
+    """Write (or, when the month was archived before, extend) one user's month.
+
+    The file is replaced atomically; returns the unsaved-or-updated TransactionArchive.
+    """
+    archive = TransactionArchive.objects.filter(user_id=user_id, month=month).first()
+    if archive is not None:
+        rows = [*read(archive), *rows]
+    else:
+        archive = TransactionArchive(
+            user_id=user_id, month=month, path=f"transactions/{user_id}/{month:%Y-%m}.jsonl.gz")
+
+    path = root() / archive.path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    totals = {}
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        for row in sorted(rows, key=lambda row: row["timestamp"]):
+            f.write(_encode(row) + "\n")
+            total = totals.setdefault(row["transaction_type"], {"count": 0, "amount": Decimal(0)})
+            total["count"] += 1
+            total["amount"] += row["amount"]
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+    archive.row_count = sum(total["count"] for total in totals.values())
+    archive.totals = {kind: {"count": t["count"], "amount": str(t["amount"])} for kind, t in totals.items()}
+    return archive
+
+
+def archives_for(user, start=None, end=None):
+    """The user's archived months overlapping ``[start, end]``, newest first"""
+    archives = TransactionArchive.objects.filter(user=user)
+    if start is not None:
+        archives = archives.filter(month__gte=start.astimezone(dt_timezone.utc).date().replace(day=1))
+    if end is not None:
+        archives = archives.filter(month__lte=end.astimezone(dt_timezone.utc).date())
+    return list(archives.order_by("-month"))
+
+
+def matches(row, transaction_type=None, project_id=None, start=None, end=None):
+    """Same filters TransactionHistoryView applies in SQL"""
+    if transaction_type and row["transaction_type"] != transaction_type:
+        return False
+    if project_id and project_id not in (row["project"], row["from_project"], row["to_project"]):
+        return False
+    if start is not None and row["timestamp"] < start:
+        return False
+    if end is not None and row["timestamp"] > end:
+        return False
+    return True
+
+
+def summarize(archives, transaction_type=None, project_id=None, start=None, end=None):
+    """``{transaction_type: (count, amount)}`` over archived rows matching the filters.
+
+    Months entirely inside the range come from the stored totals without opening files.
+    """
+    summary = {}
+
+    def add(kind, count, amount):
+        previous = summary.get(kind, (0, Decimal(0)))
+        summary[kind] = (previous[0] + count, previous[1] + amount)
+
+    for archive in archives:
+        month_start, month_end = month_bounds(archive.month)
+        if (project_id is None and (start is None or start <= month_start)
+                and (end is None or end >= month_end)):
+            for kind, total in archive.totals.items():
+                if not transaction_type or kind == transaction_type:
+                    add(kind, total["count"], Decimal(total["amount"]))
+            continue
+        for row in read(archive):
+            if matches(row, transaction_type, project_id, start, end):
+                add(row["transaction_type"], 1, row["amount"])
+    return summary
+
+
+def latest_rows(archives, limit, **filters):
+    """Up to ``limit`` matching archived rows, newest first (``archives`` newest month first)"""
+    rows = []
+    for archive in archives:
+        if len(rows) >= limit:
+            break
+        month = [row for row in read(archive) if matches(row, **filters)]
+        rows.extend(reversed(month))
+    return rows[:limit]
+
+
+def replay(user, until, main_account_since, projects_since):
+    """Archived balance deltas before ``until``, each account replayed from its own checkpoint.
+
+    Returns ``(main_account_delta, {project_id: delta})``.
+    """
+    since = min([main_account_since, *projects_since.values()])
+    main_account, projects = ledger.ZERO, dict.fromkeys(projects_since, ledger.ZERO)
+    for archive in archives_for(user, since, until):
+        for row in read(archive):
+            timestamp = row["timestamp"]
+            if timestamp >= until:
+                continue
+            if timestamp >= main_account_since:
+                main_account += ledger.main_account_delta_of(row)
+            for project in {row["project"], row["from_project"], row["to_project"]} & projects.keys():
+                if timestamp >= projects_since[project]:
+                    projects[project] += ledger.project_delta_of(row, project)
+    return main_account, projects
@@ -0,0 +1,34 @@
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from . import sharding
+
+
+class ShardedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that routes the rest of the request to the user's shard"""
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            sharding.activate(sharding.shard_for_user(result[0]))
+        return result
+
+
+def stream_user(request):
+    """Authenticate a plain Django request for the event stream.
+
+    Browsers' EventSource can't send an Authorization header, so ``?token=<access token>``
+    is accepted as well. Returns the user or None.
+    """
+    auth = ShardedJWTAuthentication()
+    try:
+        result = auth.authenticate(request)
+        if result is not None:
+            return result[0]
+        raw_token = request.GET.get("token")
+        if not raw_token:
+            return None
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken):
+        return None
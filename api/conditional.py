@@ -0,0 +1,52 @@
+"""
+ETag / If-None-Match support for polled GET endpoints, keyed on DataVersion.
+"""
+import hashlib
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import DataVersion
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = "Not modified."
+
+
+def make_etag(request, version):
+    """Weak ETag over the user's data version and the full request path (query included)"""
+    digest = hashlib.sha1(
+        f"{request.user.pk}:{version}:{request.get_full_path()}".encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    # Weak comparison: W/"x" and "x" match
+    return "*" in candidates or etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in candidates}
+
+
+class ConditionalGetMixin:
+    """Answer GET with 304 when the client's ETag is current, before the handler runs any queries"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method == "GET" and request.user.is_authenticated:
+            self.etag = make_etag(request, DataVersion.current(request.user))
+            if etag_matches(request.headers.get("If-None-Match"), self.etag):
+                raise NotModified()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "etag", None) and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            if response.status_code == status.HTTP_304_NOT_MODIFIED:
+                response.data = None
+            response["ETag"] = self.etag
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ["Authorization"])
+        return response
@@ -0,0 +1,71 @@
+"""
+Row counts for result sets too large to ``COUNT(*)`` on every request.
+
+On PostgreSQL, a count is first estimated without reading the rows: an unfiltered
+table from its catalog row estimate (``pg_class.reltuples``, refreshed by
+autovacuum/ANALYZE), anything else from the planner's ``EXPLAIN`` row estimate. When
+the estimate is at least APPROXIMATE_COUNT_THRESHOLD rows it is returned as is;
+smaller results, other backends and ``?exact_count=true`` requests get ``count()``.
+"""
+import json
+
+from django.conf import settings
+from django.db import connections
+
+
+def wants_exact(request):
+    """``?exact_count=true``: the caller will pay for an exact ``COUNT(*)``"""
+    return request.query_params.get('exact_count', 'false').lower() == 'true'
+
+
+def table_estimate(model, using):
+    """Catalog estimate of ``model``'s rows on ``using`` (summed over partitions).
+
+    None on other backends and for tables never analyzed.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        # A partitioned parent has no rows of its own: add up its partitions instead
+        cursor.execute(
+            "SELECT bool_and(c.reltuples >= 0), sum(c.reltuples)::bigint FROM pg_class c "
+            "WHERE c.relkind IN ('r', 'm') AND (c.oid = to_regclass(%s) OR c.oid IN "
+            "(SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s)))",
+            [table, table])
+        analyzed, rows = cursor.fetchone()
+    return rows if analyzed else None
+
+
+def planner_estimate(queryset):
+    """Rows the PostgreSQL planner expects ``queryset`` to return; None elsewhere"""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    query = queryset.order_by().values("pk").query
+    sql, params = query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate(queryset):
+    query = queryset.query
+    if not query.where and not query.is_sliced and not query.distinct and not query.combinator:
+        rows = table_estimate(queryset.model, queryset.db)
+        if rows is not None:
+            return rows
+    return planner_estimate(queryset)
+
+
+def approximate_count(queryset, exact=False):
+    """``(count, is_exact)``: the estimate for large results, ``count()`` otherwise"""
+    if not exact:
+        rows = estimate(queryset)
+        if rows is not None and rows >= settings.APPROXIMATE_COUNT_THRESHOLD:
+            return rows, False
+    return queryset.count(), True
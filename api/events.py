@@ -0,0 +1,163 @@
+"""
+Server-Sent Events for budget alerts and balance changes (served under ASGI).
+
+Each open stream is an idle coroutine waiting on an ``asyncio.Event``; nothing runs
+until the user's data changes. Wake-ups come from two places:
+
+- in-process: DataVersionMiddleware calls ``broker.notify(user_id)`` after every
+  successful write handled by this process;
+- DB polling: one task per process reads the DataVersion of every connected user
+  (one query per shard every ``EVENTS_POLL_INTERVAL`` seconds) and wakes the streams
+  whose version moved, covering writes made by other workers and by commands.
+
+On wake-up the stream compares the user's balances and alerts with what it last sent
+and emits only the differences.
+"""
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from . import sharding
+from .models import BudgetAlert, DataVersion, MainAccount, Project
+from .renderers import FastJSONRenderer
+from .serializers import BudgetAlertSerializer
+
+
+class Broker:
+    """Per-process registry of open streams, keyed by user id"""
+
+    def __init__(self):
+        self.subscribers = {}  # user_id -> set of asyncio.Event
+        self.shards = {}  # user_id -> shard alias
+        self.versions = {}  # user_id -> last DataVersion a stream has seen
+        self.loop = None
+        self.poller = None
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id, shard):
+        self.loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(event)
+            self.shards[user_id] = shard
+        poll_interval = getattr(settings, "EVENTS_POLL_INTERVAL", 2)
+        if poll_interval and (self.poller is None or self.poller.done()):
+            self.poller = self.loop.create_task(self._poll(poll_interval))
+        return event
+
+    def unsubscribe(self, user_id, event):
+        with self.lock:
+            events = self.subscribers.get(user_id, set())
+            events.discard(event)
+            if not events:
+                self.subscribers.pop(user_id, None)
+                self.shards.pop(user_id, None)
+                self.versions.pop(user_id, None)
+
+    def seen(self, user_id, version):
+        with self.lock:
+            if user_id in self.subscribers:
+                self.versions[user_id] = max(version, self.versions.get(user_id, 0))
+
+    def notify(self, user_id):
+        """Wake the user's streams; safe to call from any thread"""
+        if user_id in self.subscribers and self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._wake, user_id)
+
+    def _wake(self, user_id):
+        for event in list(self.subscribers.get(user_id, ())):
+            event.set()
+
+    async def _poll(self, interval):
+        while self.subscribers:
+            await asyncio.sleep(interval)
+            for user_id in await sync_to_async(self._changed_users)():
+                self._wake(user_id)
+
+    def _changed_users(self):
+        with self.lock:
+            by_shard = {}
+            for user_id, shard in self.shards.items():
+                by_shard.setdefault(shard, []).append(user_id)
+            versions = dict(self.versions)
+        changed = []
+        for shard, user_ids in by_shard.items():
+            current = DataVersion.objects.using(shard).filter(pk__in=user_ids).values_list("pk", "version")
+            changed.extend(pk for pk, version in current if version > versions.get(pk, 0))
+        return changed
+
+
+broker = Broker()
+renderer = FastJSONRenderer()
+
+
+def format_event(name, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {name}", f"data: {renderer.render(data).decode()}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def snapshot(user):
+    with sharding.use_shard(sharding.shard_for_user(user)):
+        return {
+            "version": DataVersion.current(user),
+            "main_account_balance": MainAccount.objects.filter(user=user).values_list(
+                "balance", flat=True).first(),
+            "projects": dict(Project.objects.filter(user=user).values_list("id", "budget")),
+        }
+
+
+def changes(user, previous, alerts_since):
+    """New state plus the events describing how it differs from ``previous``"""
+    state = snapshot(user)
+    events = []
+    with sharding.use_shard(sharding.shard_for_user(user)):
+        alerts = list(BudgetAlert.objects.filter(user=user, created_at__gt=alerts_since)
+                      .select_related("project").order_by("created_at"))
+    for alert in alerts:
+        events.append(format_event("alert", BudgetAlertSerializer(alert).data, state["version"]))
+
+    projects = {pk: budget for pk, budget in state["projects"].items()
+                if previous["projects"].get(pk) != budget}
+    removed = [pk for pk in previous["projects"] if pk not in state["projects"]]
+    if state["main_account_balance"] != previous["main_account_balance"] or projects or removed:
+        events.append(format_event("balance", {
+            "main_account_balance": state["main_account_balance"],
+            "projects": [{"id": pk, "budget": budget} for pk, budget in projects.items()],
+            "removed_projects": removed,
+        }, state["version"]))
+    return state, events, alerts[-1].created_at if alerts else alerts_since
+
+
+async def stream(user):
+    """The SSE body: an initial ``balance`` snapshot, then ``alert`` / ``balance`` events"""
+    heartbeat = getattr(settings, "EVENTS_HEARTBEAT", 15)
+    shard = await sync_to_async(sharding.shard_for_user)(user)
+    wake = broker.subscribe(user.pk, shard)
+    try:
+        alerts_since = timezone.now()
+        state = await sync_to_async(snapshot)(user)
+        broker.seen(user.pk, state["version"])
+        yield f"retry: {heartbeat * 1000}\n\n"
+        yield format_event("balance", {
+            "main_account_balance": state["main_account_balance"],
+            "projects": [{"id": pk, "budget": budget} for pk, budget in state["projects"].items()],
+            "removed_projects": [],
+        }, state["version"])
+        while True:
+            try:
+                await asyncio.wait_for(wake.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            wake.clear()
+            state, events, alerts_since = await sync_to_async(changes)(user, state, alerts_since)
+            broker.seen(user.pk, state["version"])
+            for event in events:
+                yield event
+    finally:
+        broker.unsubscribe(user.pk, wake)
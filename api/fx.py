@@ -0,0 +1,93 @@
+"""
+Currency conversion from the local FxRate table (loaded from files by
+``manage.py load_fx_rates``; nothing is fetched over the network).
+
+Rates are looked up per ``(currency, day)``, never per row: reports aggregate amounts
+in SQL grouped by currency and day, then ``convert_totals`` converts each group total
+once, with every rate the report needs fetched in a single query. A day without a
+published rate (weekends, holidays) uses the latest earlier one.
+"""
+from bisect import bisect_right
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import FxRate
+
+CENTS = Decimal("0.01")
+ONE = Decimal(1)
+
+
+class MissingRate(Exception):
+    def __init__(self, currency, day):
+        super().__init__(f"No FX rate for {currency} on or before {day:%Y-%m-%d}")
+        self.currency = currency
+        self.day = day
+
+
+class Rates:
+    """Rates of ``currencies`` for days in ``[start, end]``, fetched in one query"""
+
+    def __init__(self, currencies, start, end):
+        self.base = settings.FX_BASE_CURRENCY
+        self.series = {currency: ([], []) for currency in set(currencies) - {self.base}}
+        if not self.series:
+            return
+        # Everything in range plus, per currency, the last rate before it to carry forward
+        last_before = FxRate.objects.filter(
+            currency=OuterRef("currency"), date__lte=start).order_by("-date").values("date")[:1]
+        rows = (FxRate.objects.filter(currency__in=self.series, date__lte=end)
+                .alias(first=Coalesce(Subquery(last_before), start))
+                .filter(date__gte=F("first"))
+                .order_by("currency", "date").values_list("currency", "date", "rate"))
+        for currency, day, rate in rows:
+            dates, rates = self.series[currency]
+            dates.append(day)
+            rates.append(rate)
+
+    def rate(self, currency, day):
+        """Value of one unit of ``currency`` in the base currency on ``day``"""
+        if currency == self.base:
+            return ONE
+        dates, rates = self.series.get(currency, ((), ()))
+        i = bisect_right(dates, day) - 1
+        if i < 0:
+            raise MissingRate(currency, day)
+        return rates[i]
+
+    def convert(self, amount, source, target, day):
+        if source == target:
+            return amount
+        value = amount * self.rate(source, day) / self.rate(target, day)
+        return value.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def convert(amount, source, target, day=None):
+    """One amount at ``day``'s rate (default today); used when money crosses currencies"""
+    if source == target:
+        return amount
+    day = day or timezone.localdate()
+    return Rates({source, target}, day, day).convert(amount, source, target, day)
+
+
+def convert_totals(rows, target, amount_keys=("total",), currency_key="currency", day_key="day"):
+    """Convert grouped rows carrying a currency and a day into ``target``.
+
+    One conversion per row (i.e. per ``(currency, day)`` group, not per underlying
+    amount); rows already in ``target`` are returned as they are, without a query.
+    """
+    rows = list(rows)
+    foreign = [row for row in rows if row[currency_key] != target]
+    if not foreign:
+        return rows
+    days = [row[day_key] for row in foreign]
+    rates = Rates({row[currency_key] for row in foreign} | {target}, min(days), max(days))
+    for row in foreign:
+        for key in amount_keys:
+            if row[key] is not None:
+                row[key] = rates.convert(row[key], row[currency_key], target, row[day_key])
+        row[currency_key] = target
+    return rows
@@ -0,0 +1,153 @@
+"""
+Ledger helpers: how each Transaction moves main account and project balances,
+and point-in-time balances computed from the nearest BalanceCheckpoint.
+"""
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Func, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import BalanceCheckpoint, MainAccount, Transaction
+
+MONEY = DecimalField(max_digits=15, decimal_places=2)
+ZERO = Decimal("0.00")
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Transaction types that credit / debit the main account
+MAIN_ACCOUNT_CREDITS = ("deposit", "refund")
+MAIN_ACCOUNT_DEBITS = ("allocate",)
+
+
+def main_account_delta():
+    """Signed effect of a transaction row on its main account balance"""
+    return Case(
+        When(transaction_type__in=MAIN_ACCOUNT_CREDITS, then=F("amount")),
+        When(transaction_type__in=MAIN_ACCOUNT_DEBITS, then=-F("amount")),
+        default=Value(ZERO),
+        output_field=MONEY,
+    )
+
+
+def received():
+    """What the receiving project got: ``counter_amount`` when the transfer crossed currencies"""
+    return Coalesce(F("counter_amount"), F("amount"), output_field=MONEY)
+
+
+def project_delta(project):
+    """Signed effect of a transaction row on ``project`` (an id or OuterRef)"""
+    return Case(
+        When(project_id=project, transaction_type="allocate", then=received()),
+        When(project_id=project, transaction_type="adjustment", then=F("amount")),
+        When(project_id=project, transaction_type="expense", then=-F("amount")),
+        When(to_project_id=project, transaction_type="transfer", then=received()),
+        When(from_project_id=project, transaction_type="transfer", then=-F("amount")),
+        default=Value(ZERO),
+        output_field=MONEY,
+    )
+
+
+def project_funding_delta(project):
+    """Signed effect on ``project``'s allocated funds (allocations, adjustments and transfers, not expenses)"""
+    return Case(
+        When(project_id=project, transaction_type="allocate", then=received()),
+        When(project_id=project, transaction_type="adjustment", then=F("amount")),
+        When(to_project_id=project, transaction_type="transfer", then=received()),
+        When(from_project_id=project, transaction_type="transfer", then=-F("amount")),
+        default=Value(ZERO),
+        output_field=MONEY,
+    )
+
+
+def main_account_delta_of(row):
+    """Python mirror of ``main_account_delta`` for one values() or archived row"""
+    if row["transaction_type"] in MAIN_ACCOUNT_CREDITS:
+        return row["amount"]
+    if row["transaction_type"] in MAIN_ACCOUNT_DEBITS:
+        return -row["amount"]
+    return ZERO
+
+
+def project_delta_of(row, project, funding_only=False):
+    """Python mirror of ``project_delta`` (or ``project_funding_delta``) for one row"""
+    kind = row["transaction_type"]
+    received = row["amount"] if row.get("counter_amount") is None else row["counter_amount"]
+    if kind == "allocate" and row["project"] == project:
+        return received
+    if kind == "adjustment" and row["project"] == project:
+        return row["amount"]
+    if kind == "expense" and row["project"] == project and not funding_only:
+        return -row["amount"]
+    if kind == "transfer":
+        if row["to_project"] == project:
+            return received
+        if row["from_project"] == project:
+            return -row["amount"]
+    return ZERO
+
+
+def record_budget_adjustment(project, amount, description):
+    """Ledger entry for a budget set directly (project create/update) instead of allocated.
+
+    ``amount`` is the signed change, in the project's currency; it moves no main account funds.
+    """
+    return Transaction.objects.create(
+        user_id=project.user_id, project=project,
+        main_account=MainAccount.objects.get(user_id=project.user_id),
+        transaction_type="adjustment", amount=amount, currency=project.currency,
+        description=description)
+
+
+def project_filter(project):
+    """Transactions that touch ``project`` in any of its three roles"""
+    return Q(project_id=project) | Q(from_project_id=project) | Q(to_project_id=project)
+
+
+def amount_by_pk(amounts):
+    """``CASE pk WHEN ... THEN amount`` so per-row increments apply in a single UPDATE"""
+    return Case(
+        *[When(pk=pk, then=Value(amount)) for pk, amount in amounts.items()],
+        default=Value(ZERO),
+        output_field=MONEY,
+    )
+
+
+def sum_subquery(queryset, delta):
+    """Scalar ``SUM(delta)`` subquery (no GROUP BY) over ``queryset``"""
+    total = queryset.annotate(total=Func(delta, function="SUM")).values("total")
+    return Coalesce(Subquery(total, output_field=MONEY), Value(ZERO), output_field=MONEY)
+
+
+def _annotate_as_of(queryset, checkpoints, transactions, delta, as_of):
+    checkpoints = checkpoints.filter(as_of__lte=as_of).order_by("-as_of")
+    queryset = queryset.annotate(
+        checkpoint_balance=Coalesce(
+            Subquery(checkpoints.values("balance")[:1], output_field=MONEY),
+            Value(ZERO), output_field=MONEY),
+        checkpoint_as_of=Coalesce(
+            Subquery(checkpoints.values("as_of")[:1]), Value(EPOCH)),
+    )
+    window = transactions.filter(timestamp__gte=OuterRef("checkpoint_as_of"), timestamp__lt=as_of)
+    return queryset.annotate(balance_as_of=F("checkpoint_balance") + sum_subquery(window, delta))
+
+
+def annotate_main_account_balance(queryset, as_of):
+    """Annotate MainAccounts with ``balance_as_of``: checkpoint plus later deltas"""
+    return _annotate_as_of(
+        queryset,
+        BalanceCheckpoint.objects.filter(main_account=OuterRef("pk")),
+        Transaction.objects.filter(main_account=OuterRef("pk")),
+        main_account_delta(),
+        as_of,
+    )
+
+
+def annotate_project_balance(queryset, as_of):
+    """Annotate Projects with ``balance_as_of``: checkpoint plus later deltas"""
+    return _annotate_as_of(
+        queryset,
+        BalanceCheckpoint.objects.filter(project=OuterRef("pk")),
+        Transaction.objects.filter(project_filter(OuterRef("pk"))),
+        project_delta(OuterRef("pk")),
+        as_of,
+    )
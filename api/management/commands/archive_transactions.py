@@ -0,0 +1,74 @@
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from api import analytics, archive, partitioning, sharding
+from api.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Move transactions older than the retention window into gzipped JSONL files "
+        "(one per user and month) and remove them from the database. History and "
+        "point-in-time balance queries read archived months back transparently."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-months", type=int, default=settings.TRANSACTION_RETENTION_MONTHS,
+                            help="Months of transactions to keep in the database")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived")
+
+    def handle(self, *args, **options):
+        if options["retention_months"] < 1:
+            raise CommandError("--retention-months must be at least 1")
+        this_month = timezone.now().date().replace(day=1)
+        cutoff = archive.month_bounds(partitioning.add_months(this_month, -options["retention_months"]))[0]
+
+        if not options["dry_run"]:
+            # Balances must never need archived rows: checkpoint every account at the cutoff first
+            call_command("create_balance_checkpoints", as_of=cutoff.isoformat(), stdout=self.stdout)
+
+        archived = 0
+        for alias in sharding.shards():
+            with sharding.use_shard(alias):
+                archived += self._archive_shard(alias, cutoff, options["batch_size"], options["dry_run"])
+        verb = "Would archive" if options["dry_run"] else "Archived"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {archived} transactions older than {cutoff:%Y-%m-%d} to {archive.root()}"))
+
+    def _archive_shard(self, alias, cutoff, batch_size, dry_run):
+        months = (Transaction.objects.filter(timestamp__lt=cutoff)
+                  .annotate(month=analytics.truncate("timestamp", "month"))
+                  .values_list("month", flat=True).distinct().order_by("month"))
+        total = 0
+        for month in list(months):
+            start, end = archive.month_bounds(month)
+            rows = Transaction.objects.filter(timestamp__gte=start, timestamp__lt=end)
+            if dry_run:
+                count = rows.count()
+                self.stdout.write(f"[{alias}] {month:%Y-%m}: {count} transactions")
+                total += count
+                continue
+
+            # Files first; the database rows only go once the index rows pointing at them commit
+            archives = [
+                archive.write(user_id, month, list(user_rows))
+                for user_id, user_rows in groupby(
+                    rows.order_by("user_id", "timestamp").values(*archive.FIELDS).iterator(chunk_size=batch_size),
+                    key=itemgetter("user"))
+            ]
+            count = sum(item.row_count for item in archives)
+            with transaction.atomic(using=alias):
+                for item in archives:
+                    item.save()
+                if not partitioning.drop_partition(connections[alias], month):
+                    rows.delete()
+            self.stdout.write(f"[{alias}] {month:%Y-%m}: {len(archives)} files")
+            total += count
+        return total
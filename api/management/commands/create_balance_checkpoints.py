@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api import ledger, sharding
+from api.models import BalanceCheckpoint, MainAccount, Project, Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a balance checkpoint for every main account and project that has "
+        "transactions since its last checkpoint. Run periodically (e.g. nightly) "
+        "so point-in-time balance lookups only replay a short window."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--as-of", help="Checkpoint time (ISO datetime, default: now)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        as_of = timezone.now()
+        if options["as_of"]:
+            as_of = parse_datetime(options["as_of"])
+            if as_of is None:
+                raise CommandError("Invalid --as-of datetime")
+            if timezone.is_naive(as_of):
+                as_of = timezone.make_aware(as_of)
+
+        batch_size = options["batch_size"]
+        for alias in sharding.shards():
+            with sharding.use_shard(alias):
+                self._checkpoint_shard(alias, as_of, batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Checkpoints written as of {as_of.isoformat()}"))
+
+    def _checkpoint_shard(self, alias, as_of, batch_size):
+        accounts = ledger.annotate_main_account_balance(MainAccount.objects.all(), as_of).filter(
+            Exists(Transaction.objects.filter(
+                main_account=OuterRef("pk"),
+                timestamp__gte=OuterRef("checkpoint_as_of"), timestamp__lt=as_of))
+        ).values_list("pk", "user_id", "balance_as_of")
+        created = self._write(
+            (BalanceCheckpoint(user_id=user_id, main_account_id=pk, balance=balance, as_of=as_of)
+             for pk, user_id, balance in accounts.iterator(chunk_size=batch_size)),
+            batch_size,
+        )
+        self.stdout.write(f"[{alias}] Main accounts: {created} checkpoints")
+
+        projects = ledger.annotate_project_balance(Project.objects.all(), as_of).filter(
+            Exists(Transaction.objects.filter(
+                ledger.project_filter(OuterRef("pk")),
+                timestamp__gte=OuterRef("checkpoint_as_of"), timestamp__lt=as_of))
+        ).values_list("pk", "user_id", "balance_as_of")
+        created = self._write(
+            (BalanceCheckpoint(user_id=user_id, project_id=pk, balance=balance, as_of=as_of)
+             for pk, user_id, balance in projects.iterator(chunk_size=batch_size)),
+            batch_size,
+        )
+        self.stdout.write(f"[{alias}] Projects: {created} checkpoints")
+
+    def _write(self, checkpoints, batch_size):
+        created = 0
+        batch = []
+        for checkpoint in checkpoints:
+            batch.append(checkpoint)
+            if len(batch) >= batch_size:
+                created += len(BalanceCheckpoint.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created += len(BalanceCheckpoint.objects.bulk_create(batch))
+        return created
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+
+from api import partitioning, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly transaction partitions on PostgreSQL (run monthly, "
+        "e.g. from cron). Does nothing on databases without partitioning."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=3)
+
+    def handle(self, *args, **options):
+        this_month = timezone.now().date().replace(day=1)
+        last_month = partitioning.add_months(this_month, options["months_ahead"])
+        for alias in sharding.shards():
+            connection = connections[alias]
+            if not partitioning.is_partitioned(connection):
+                self.stdout.write(f"[{alias}] {partitioning.TABLE} is not partitioned; skipping")
+                continue
+            with transaction.atomic(using=alias):
+                created = partitioning.ensure_partitions(connection, this_month, last_month)
+            self.stdout.write(f"[{alias}] created {len(created)} partitions: {', '.join(created) or '-'}")
@@ -0,0 +1,67 @@
+import csv
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from api.models import FxRate
+
+
+class Command(BaseCommand):
+    help = (
+        "Load daily FX rates from CSV files (columns: date,currency,rate, where rate is "
+        "the value of one unit of currency in FX_BASE_CURRENCY) into the FxRate table. "
+        "Existing (currency, date) rows are overwritten, so files can be reloaded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*",
+                            help="CSV files or directories (default: every *.csv in FX_RATES_DIR)")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        paths = [Path(path) for path in options["paths"]] or [Path(settings.FX_RATES_DIR)]
+        files = []
+        for path in paths:
+            if path.is_dir():
+                files.extend(sorted(path.glob("*.csv")))
+            elif path.is_file():
+                files.append(path)
+            else:
+                raise CommandError(f"{path} does not exist")
+
+        loaded = 0
+        for path in files:
+            count = 0
+            # Keyed so a date repeated within a batch is one row (the last one wins)
+            batch = {}
+            for rate in self._read(path):
+                batch[rate.currency, rate.date] = rate
+                if len(batch) >= options["batch_size"]:
+                    count += self._save(list(batch.values()))
+                    batch = {}
+            if batch:
+                count += self._save(list(batch.values()))
+            self.stdout.write(f"{path}: {count} rates")
+            loaded += count
+        self.stdout.write(self.style.SUCCESS(f"Loaded {loaded} rates from {len(files)} files"))
+
+    def _read(self, path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    day = parse_date(row["date"].strip())
+                    currency = row["currency"].strip().upper()
+                    rate = Decimal(row["rate"].strip())
+                except (KeyError, AttributeError, ValueError, InvalidOperation):
+                    raise CommandError(f"{path}:{line}: expected date,currency,rate")
+                if day is None or len(currency) != 3 or rate <= 0:
+                    raise CommandError(f"{path}:{line}: invalid rate {dict(row)}")
+                yield FxRate(currency=currency, date=day, rate=rate)
+
+    def _save(self, rates):
+        FxRate.objects.bulk_create(
+            rates, update_conflicts=True, unique_fields=["currency", "date"], update_fields=["rate"])
+        return len(rates)
@@ -0,0 +1,20 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from api import sharding
+
+
+class Command(BaseCommand):
+    help = "Run migrate on every configured shard (the schema is the same everywhere)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("app_label", nargs="?")
+        parser.add_argument("migration_name", nargs="?")
+
+    def handle(self, *args, **options):
+        migrate_args = [arg for arg in (options["app_label"], options["migration_name"]) if arg]
+        for alias in sharding.shards():
+            self.stdout.write(f"[{alias}]")
+            call_command("migrate", *migrate_args, database=alias,
+                         verbosity=options["verbosity"], interactive=False)
+        self.stdout.write(self.style.SUCCESS(f"Migrated {len(sharding.shards())} databases"))
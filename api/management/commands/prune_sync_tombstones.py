@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api import sharding, sync
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete sync tombstones older than SYNC_TOMBSTONE_DAYS. Clients whose cursor "
+        "predates that get a full resync from /api/sync/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Override SYNC_TOMBSTONE_DAYS")
+
+    def handle(self, *args, **options):
+        pruned = 0
+        for alias in sharding.shards():
+            with sharding.use_shard(alias):
+                pruned += sync.prune_tombstones(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} tombstones"))
@@ -0,0 +1,84 @@
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+
+from api import sharding
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Show how user data is spread over the configured shards and move users "
+        "between them: one user with --user/--to, or enough users to even out "
+        "user counts (e.g. after adding a shard)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Id or username of a single user to move (needs --to)")
+        parser.add_argument("--to", help="Target shard alias")
+        parser.add_argument("--max-moves", type=int, default=None,
+                            help="Stop after moving this many users")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT while copying")
+        parser.add_argument("--dry-run", action="store_true", help="Only print the planned moves")
+
+    def handle(self, *args, **options):
+        aliases = sharding.shards()
+        if options["to"] and options["to"] not in aliases:
+            raise CommandError(f"Unknown shard {options['to']!r}; configured: {', '.join(aliases)}")
+
+        self._report()
+        if options["user"]:
+            if not options["to"]:
+                raise CommandError("--user needs --to")
+            try:
+                lookup = Q(pk=uuid.UUID(options["user"]))
+            except ValueError:
+                lookup = Q(username=options["user"])
+            user = User.objects.filter(lookup).first()
+            if user is None:
+                raise CommandError(f"User {options['user']!r} not found")
+            moves = [(user, options["to"])]
+        else:
+            moves = self._plan(aliases, options["max_moves"])
+
+        if not moves:
+            self.stdout.write(self.style.SUCCESS("Shards are balanced; nothing to move"))
+            return
+        for user, target in moves:
+            self.stdout.write(f"{user.username}: {sharding.shard_for_user(user)} -> {target}")
+            if not options["dry_run"]:
+                moved = sharding.move_user(user, target, batch_size=options["batch_size"])
+                self.stdout.write(f"  {moved} rows moved")
+        if not options["dry_run"]:
+            self._report()
+            self.stdout.write(self.style.SUCCESS(f"Moved {len(moves)} users"))
+
+    def _plan(self, aliases, max_moves):
+        """Move users off shards holding more than their even share, onto the emptiest shards"""
+        counts = dict.fromkeys(aliases, 0)
+        counts.update(User.objects.filter(shard__in=aliases).values_list("shard")
+                      .annotate(n=Count("pk")).order_by())
+        target = -(-sum(counts.values()) // len(aliases))
+
+        moves = []
+        for alias in sorted(aliases, key=counts.get, reverse=True):
+            excess = counts[alias] - target
+            if excess <= 0:
+                break
+            for user in User.objects.filter(shard=alias).order_by("date_joined")[:excess]:
+                destination = min(aliases, key=counts.get)
+                if counts[destination] >= target:
+                    break
+                moves.append((user, destination))
+                counts[alias] -= 1
+                counts[destination] += 1
+                if max_moves is not None and len(moves) >= max_moves:
+                    return moves
+        return moves
+
+    def _report(self):
+        users = dict(User.objects.values_list("shard").annotate(n=Count("pk")).order_by())
+        for alias, counts in sharding.row_counts().items():
+            rows = ", ".join(f"{label.split('.')[1]}={n}" for label, n in counts.items())
+            self.stdout.write(f"[{alias}] users={users.get(alias, 0)} {rows}")
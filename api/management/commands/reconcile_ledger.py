@@ -0,0 +1,133 @@
+import csv
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api import ledger, sharding
+from api.models import DataVersion, MainAccount, Project
+
+REPORT_FIELDS = ["shard", "kind", "id", "user_id", "stored", "expected", "difference", "repaired"]
+
+
+def user_partitions(count):
+    """Split the UUID space into ``count`` contiguous ``[lo, hi)`` user id ranges"""
+    step = (1 << 128) // count
+    bounds = [uuid.UUID(int=i * step) for i in range(count)]
+    return [(lo, hi) for lo, hi in zip(bounds, bounds[1:] + [None])]
+
+
+def _init_worker():
+    # Forked workers must not share the parent's database connections
+    django.setup()
+    connections.close_all()
+
+
+def reconcile_partition(alias, lo, hi, repair, adopt_budgets=False):
+    """Find (and optionally repair) balance drift on shard ``alias`` for users with ``lo <= id < hi``"""
+    with sharding.use_shard(alias):
+        return _reconcile(alias, lo, hi, repair, adopt_budgets)
+
+
+def _reconcile(alias, lo, hi, repair, adopt_budgets):
+    users = Q(user_id__gte=lo) if hi is None else Q(user_id__gte=lo, user_id__lt=hi)
+    rows = []
+    for kind, model, field, annotate in (
+        ("main_account", MainAccount, "balance", ledger.annotate_main_account_balance),
+        ("project", Project, "budget", ledger.annotate_project_balance),
+    ):
+        # Stored and expected balances are compared in SQL, so only drifted rows come back
+        drifted = annotate(model.objects.filter(users), timezone.now()).exclude(
+            **{field: F("balance_as_of")}
+        ).values_list("pk", "user_id", field, "balance_as_of")
+
+        for pk, user_id, stored, expected in drifted.iterator():
+            repaired = False
+            if adopt_budgets and kind == "project":
+                repaired = _adopt_budget(alias, pk, stored, expected)
+            elif repair:
+                with transaction.atomic(using=alias):
+                    # Conditional on the value we read, so concurrent writes are never clobbered
+                    repaired = model.objects.filter(pk=pk, **{field: stored}).update(
+                        **{field: expected}) == 1
+                    if repaired:
+                        DataVersion.bump(user_id)
+            rows.append((alias, kind, str(pk), str(user_id), stored, expected, expected - stored, repaired))
+    return rows
+
+
+def _adopt_budget(alias, pk, stored, expected):
+    """Keep the stored budget and record the difference as a ledger adjustment"""
+    with transaction.atomic(using=alias):
+        project = Project.objects.select_for_update().filter(pk=pk, budget=stored).first()
+        if project is None:
+            return False
+        change = stored - expected
+        ledger.record_budget_adjustment(project, change, f"Budget of {project.name} recorded by reconciliation")
+        Project.objects.filter(pk=pk).update(total_allocated=F("total_allocated") + change)
+        DataVersion.bump(project.user_id)
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute main account and project balances from the Transaction log and "
+        "report (optionally repair) rows whose stored balance has drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="-", help="CSV report path (default: stdout)")
+        parser.add_argument("--workers", type=int, default=4, help="Worker processes")
+        parser.add_argument("--partitions", type=int, default=64,
+                            help="Number of user id ranges to split the work into")
+        parser.add_argument("--repair", action="store_true",
+                            help="Overwrite drifted balances with the ledger value")
+        parser.add_argument("--adopt-project-budgets", action="store_true",
+                            help="Keep drifted project budgets and record the difference as an "
+                                 "adjustment transaction (for budgets set directly before those "
+                                 "were recorded in the ledger); run this before --repair")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["partitions"] < 1:
+            raise CommandError("--workers and --partitions must be positive")
+
+        report = sys.stdout if options["output"] == "-" else open(options["output"], "w", newline="")
+        writer = csv.writer(report)
+        writer.writerow(REPORT_FIELDS)
+
+        # Every shard is split into the same user id ranges
+        partitions = [(alias, lo, hi) for alias in sharding.shards()
+                      for lo, hi in user_partitions(options["partitions"])]
+        drifted = repaired = 0
+        try:
+            if options["workers"] == 1:
+                results = (reconcile_partition(*partition, options["repair"], options["adopt_project_budgets"])
+                           for partition in partitions)
+                drifted, repaired = self._write(writer, results)
+            else:
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=options["workers"], initializer=_init_worker) as pool:
+                    futures = [pool.submit(reconcile_partition, *partition, options["repair"],
+                                           options["adopt_project_budgets"])
+                               for partition in partitions]
+                    drifted, repaired = self._write(writer, (f.result() for f in as_completed(futures)))
+        finally:
+            if report is not sys.stdout:
+                report.close()
+
+        self.stderr.write(self.style.SUCCESS(
+            f"{drifted} drifted balances found, {repaired} repaired"))
+
+    def _write(self, writer, results):
+        """Stream each partition's rows to the report as soon as it finishes"""
+        drifted = repaired = 0
+        for rows in results:
+            writer.writerows(rows)
+            drifted += len(rows)
+            repaired += sum(1 for row in rows if row[-1])
+        return drifted, repaired
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from api import archive, ledger, sharding
+from api.models import DataVersion, Expense, Project, Transaction, TransactionArchive
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Project.total_spent, total_allocated and expense_count from the "
+        "Expense and Transaction tables (one UPDATE per batch of projects), plus "
+        "archived transactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        expenses = Expense.objects.filter(project=OuterRef("pk"))
+        expense_count = expenses.annotate(n=Func(F("id"), function="COUNT")).values("n")
+        counters = {
+            "total_spent": ledger.sum_subquery(expenses, F("amount")),
+            "expense_count": Coalesce(Subquery(expense_count, output_field=IntegerField()), Value(0)),
+            "total_allocated": ledger.sum_subquery(
+                Transaction.objects.filter(ledger.project_filter(OuterRef("pk"))),
+                ledger.project_funding_delta(OuterRef("pk")),
+            ),
+        }
+
+        updated = 0
+        for alias in sharding.shards():
+            with sharding.use_shard(alias):
+                updated += self._repair_shard(alias, counters, batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed counters for {updated} projects"))
+
+    def _repair_shard(self, alias, counters, batch_size):
+        updated = 0
+        ids = Project.objects.order_by("pk").values_list("pk", flat=True)
+        batch = []
+        for pk in ids.iterator(chunk_size=batch_size):
+            batch.append(pk)
+            if len(batch) >= batch_size:
+                updated += self._update(alias, batch, counters)
+                batch = []
+        if batch:
+            updated += self._update(alias, batch, counters)
+        self._add_archived_funding(alias, batch_size)
+
+        # Counters are part of cached project payloads; invalidate every client's ETag
+        DataVersion.objects.update(version=F("version") + 1)
+        return updated
+
+    def _add_archived_funding(self, alias, batch_size):
+        """total_allocated also counts allocations and transfers moved out by archive_transactions"""
+        funding = {}
+        for item in TransactionArchive.objects.all().iterator():
+            for row in archive.read(item):
+                for project in {row["project"], row["from_project"], row["to_project"]} - {None}:
+                    funding[project] = funding.get(project, ledger.ZERO) + ledger.project_delta_of(
+                        row, project, funding_only=True)
+        amounts = [(pk, amount) for pk, amount in funding.items() if amount]
+        for i in range(0, len(amounts), batch_size):
+            batch = dict(amounts[i:i + batch_size])
+            with transaction.atomic(using=alias):
+                Project.objects.filter(pk__in=batch).update(
+                    total_allocated=F("total_allocated") + ledger.amount_by_pk(batch))
+
+    def _update(self, alias, ids, counters):
+        with transaction.atomic(using=alias):
+            return Project.objects.filter(pk__in=ids).update(**counters)
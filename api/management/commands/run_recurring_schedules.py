@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api import recurring, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Post every due occurrence of the recurring expense and allocation schedules, "
+        "catching up on dates missed while it didn't run. Safe to run repeatedly "
+        "(e.g. hourly from cron): posted occurrences are never posted again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Post occurrences due on or before this day (YYYY-MM-DD; default today)")
+        parser.add_argument("--batch-size", type=int, default=500, help="Schedules per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the due schedules")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options["date"]:
+            today = parse_date(options["date"])
+            if today is None:
+                raise CommandError("--date must be YYYY-MM-DD")
+
+        totals = {"schedules": 0, "occurrences": 0, "failed": 0}
+        for alias in sharding.shards():
+            with sharding.use_shard(alias):
+                if options["dry_run"]:
+                    count = recurring.due(today).count()
+                    self.stdout.write(f"[{alias}] {count} schedules due")
+                    totals["schedules"] += count
+                    continue
+                result = recurring.post_due(today, options["batch_size"])
+                self.stdout.write(
+                    f"[{alias}] {result['occurrences']} occurrences from {result['schedules']} schedules"
+                    + (f", {result['failed']} stopped" if result["failed"] else ""))
+                for key, value in result.items():
+                    totals[key] += value
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"{totals['schedules']} schedules due by {today:%Y-%m-%d}"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Posted {totals['occurrences']} occurrences due by {today:%Y-%m-%d}"))
+        if totals["failed"]:
+            self.stdout.write(self.style.WARNING(
+                f"{totals['failed']} schedules could not be covered and stay due (see last_error)"))
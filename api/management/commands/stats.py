@@ -0,0 +1,198 @@
+import csv
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import Case, CharField, Count, Max, Min, Sum, Value, When
+from django.utils import timezone
+
+from api import sharding
+from api.models import Expense, FxRate, MainAccount, Project, User
+
+# Upper bounds of the balance histogram buckets (after "< 0" and "0")
+BUCKET_BOUNDS = [Decimal(100), Decimal(1000), Decimal(10000), Decimal(100000)]
+BUCKET_LABELS = (
+    ["< 0", "0"]
+    + [f"{lo:,}-{hi:,}" for lo, hi in zip([Decimal(0), *BUCKET_BOUNDS], BUCKET_BOUNDS)]
+    + [f">= {BUCKET_BOUNDS[-1]:,}"]
+)
+PER_USER_FIELDS = ["shard", "user_id", "username", "currency", "balance", "projects",
+                   "project_budget", "spent", "expenses"]
+
+
+def bucket(field):
+    """``CASE`` labelling each row with its BUCKET_LABELS histogram bucket"""
+    whens = [When(**{f"{field}__lt": 0}, then=Value(BUCKET_LABELS[0])),
+             When(**{field: 0}, then=Value(BUCKET_LABELS[1]))]
+    whens += [When(**{f"{field}__lt": bound}, then=Value(label))
+              for bound, label in zip(BUCKET_BOUNDS, BUCKET_LABELS[2:])]
+    return Case(*whens, default=Value(BUCKET_LABELS[-1]), output_field=CharField())
+
+
+def distribution(model, field):
+    """Per-currency summary and histogram of ``field``; a handful of grouped rows per shard"""
+    summary = model.objects.values("currency").annotate(
+        count=Count("pk"), total=Sum(field), low=Min(field), high=Max(field)).order_by()
+    histogram = model.objects.values("currency", bucket=bucket(field)).annotate(count=Count("pk")).order_by()
+    return list(summary), list(histogram)
+
+
+class Command(BaseCommand):
+    help = (
+        "Database statistics: table sizes, totals, balance distributions and top spenders. "
+        "Every figure comes from grouped aggregate queries (run on all shards in parallel), "
+        "and each section is printed as soon as it is computed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=10, help="Number of top spenders and projects")
+        parser.add_argument("--days", type=int,
+                            help="Rank spenders by expenses in the last N days (default: all time)")
+        parser.add_argument("--per-user", action="store_true",
+                            help="Also stream one CSV row per user (balance, projects, spending)")
+        parser.add_argument("--output", help="Write the per-user CSV here instead of stdout")
+
+    def handle(self, *args, **options):
+        self._table_counts()
+        self._totals()
+        self._distribution("Main account balances", MainAccount, "balance")
+        self._distribution("Project budgets", Project, "budget")
+        self._top_spenders(options["top"], options["days"])
+        if options["per_user"]:
+            self._per_user(options["output"])
+
+    def _section(self, title):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{title}"))
+
+    def _flush(self):
+        self.stdout.flush()
+
+    def _table_counts(self):
+        self._section("Rows per table")
+        counts = {"api.user": User.objects.using(sharding.DEFAULT_DB).count(),
+                  "api.fxrate": FxRate.objects.using(sharding.DEFAULT_DB).count()}
+        by_shard = sharding.row_counts()
+        for label, _ in sharding.SHARDED_MODELS:
+            counts[label] = sum(shard_counts[label] for shard_counts in by_shard.values())
+        for label, count in counts.items():
+            line = f"  {apps.get_model(label)._meta.db_table:<28} {count:>12,}"
+            if sharding.is_sharded() and label in sharding.SHARDED_LABELS:
+                line += "  (" + ", ".join(f"{alias}: {c[label]:,}" for alias, c in by_shard.items()) + ")"
+            self.stdout.write(line)
+        self._flush()
+
+    def _totals(self):
+        self._section("Totals per currency")
+
+        def totals(alias):
+            queries = {
+                "main accounts": MainAccount.objects.values("currency").annotate(
+                    amount=Sum("balance"), count=Count("pk")),
+                # Denormalized counters: no scan of the expense table
+                "project budgets": Project.objects.values("currency").annotate(
+                    amount=Sum("budget"), count=Count("pk")),
+                "spent": Project.objects.values("currency").annotate(
+                    amount=Sum("total_spent"), count=Sum("expense_count")),
+            }
+            return {name: list(query.order_by()) for name, query in queries.items()}
+
+        merged = {}
+        for result in sharding.fan_out(totals).values():
+            for name, rows in result.items():
+                for row in rows:
+                    amount, count = merged.get((name, row["currency"]), (Decimal(0), 0))
+                    merged[name, row["currency"]] = (amount + (row["amount"] or 0), count + (row["count"] or 0))
+        for (name, currency), (amount, count) in sorted(merged.items()):
+            unit = "expenses" if name == "spent" else "rows"
+            self.stdout.write(f"  {name:<16} {currency}  {amount:>18,.2f}  ({count:,} {unit})")
+        self._flush()
+
+    def _distribution(self, title, model, field):
+        self._section(f"{title} distribution")
+        summaries, histograms = {}, {}
+        for summary, histogram in sharding.fan_out(lambda alias: distribution(model, field)).values():
+            for row in summary:
+                current = summaries.setdefault(row["currency"], {"count": 0, "total": Decimal(0),
+                                                                  "low": row["low"], "high": row["high"]})
+                current["count"] += row["count"]
+                current["total"] += row["total"] or 0
+                current["low"] = min(current["low"], row["low"])
+                current["high"] = max(current["high"], row["high"])
+            for row in histogram:
+                key = (row["currency"], row["bucket"])
+                histograms[key] = histograms.get(key, 0) + row["count"]
+
+        for currency, summary in sorted(summaries.items()):
+            average = summary["total"] / summary["count"]
+            self.stdout.write(
+                f"  {currency}: {summary['count']:,} rows, min {summary['low']:,.2f}, "
+                f"max {summary['high']:,.2f}, avg {average:,.2f}")
+            for label in BUCKET_LABELS:
+                count = histograms.get((currency, label), 0)
+                share = count * 100 / summary["count"]
+                self.stdout.write(f"    {label:>20}  {count:>10,}  {share:5.1f}%  {'#' * round(share / 2)}")
+        self._flush()
+
+    def _top_spenders(self, top, days):
+        period = f"last {days} days" if days else "all time"
+        self._section(f"Top {top} spenders ({period})")
+
+        def spenders(alias):
+            if days:
+                rows = Expense.objects.filter(created_at__gte=timezone.now() - timezone.timedelta(days=days)).values(
+                    "project__user_id", "project__user__username", "project__currency").annotate(
+                    spent=Sum("amount"), expenses=Count("pk"))
+                keys = ("project__user_id", "project__user__username", "project__currency")
+            else:
+                rows = Project.objects.values("user_id", "user__username", "currency").annotate(
+                    spent=Sum("total_spent"), expenses=Sum("expense_count"))
+                keys = ("user_id", "user__username", "currency")
+            return [(row[keys[0]], row[keys[1]], row[keys[2]], row["spent"], row["expenses"])
+                    for row in rows.filter(spent__gt=0).order_by("-spent")[:top]]
+
+        def projects(alias):
+            return list(Project.objects.filter(total_spent__gt=0).order_by("-total_spent").values_list(
+                "name", "user__username", "currency", "total_spent", "expense_count")[:top])
+
+        # Each shard's top N, then the global top N of those
+        rows = sorted((row for shard in sharding.fan_out(spenders).values() for row in shard),
+                      key=lambda row: row[3], reverse=True)[:top]
+        for rank, (user_id, username, currency, spent, expenses) in enumerate(rows, start=1):
+            self.stdout.write(f"  {rank:>3}. {username:<24} {currency} {spent:>15,.2f}  ({expenses:,} expenses)")
+        self._flush()
+
+        self._section(f"Top {top} projects by spending (all time)")
+        rows = sorted((row for shard in sharding.fan_out(projects).values() for row in shard),
+                      key=lambda row: row[3], reverse=True)[:top]
+        for rank, (name, username, currency, spent, expenses) in enumerate(rows, start=1):
+            self.stdout.write(
+                f"  {rank:>3}. {name[:30]:<30} {username:<20} {currency} {spent:>15,.2f}  ({expenses:,} expenses)")
+        self._flush()
+
+    def _per_user(self, output):
+        if output:
+            with open(output, "w", newline="") as f:
+                count = self._write_per_user(csv.writer(f))
+            self.stdout.write(self.style.SUCCESS(f"\nWrote {count} users to {output}"))
+        else:
+            self._section("Per user (CSV)")
+            self._write_per_user(csv.writer(self.stdout, lineterminator="\n"))
+
+    def _write_per_user(self, writer):
+        writer.writerow(PER_USER_FIELDS)
+        count = 0
+        for alias in sharding.shards():
+            with sharding.use_shard(alias):
+                # One grouped join per shard, streamed with a server-side cursor
+                rows = MainAccount.objects.values("user_id", "user__username", "currency", "balance").annotate(
+                    projects=Count("user__projects"),
+                    project_budget=Sum("user__projects__budget"),
+                    spent=Sum("user__projects__total_spent"),
+                    expenses=Sum("user__projects__expense_count"),
+                ).order_by("user_id")
+                for row in rows.iterator(chunk_size=2000):
+                    writer.writerow([alias, row["user_id"], row["user__username"], row["currency"], row["balance"],
+                                     row["projects"], row["project_budget"] or 0, row["spent"] or 0,
+                                     row["expenses"] or 0])
+                    count += 1
+        return count
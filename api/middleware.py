@@ -0,0 +1,82 @@
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from . import events, sharding
+from .models import DataVersion
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli
+    brotli = None
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class ShardMiddleware:
+    """Scope each request's shard selection so it never leaks into the next request on this thread"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with sharding.use_shard(None):
+            return self.get_response(request)
+
+
+class DataVersionMiddleware:
+    """Bump the user's DataVersion after every successful write so cached ETags go stale"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, "user", None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            DataVersion.bump(user)
+            # Wake this process's open event streams right away (others catch up by polling)
+            events.broker.notify(user.pk)
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Brotli (when installed) for API JSON, Django's gzip for everything else.
+
+    Only responses above COMPRESSION_MIN_SIZE bytes, and never streaming ones (event
+    streams must reach the client chunk by chunk; receipts are already compressed).
+    gzip is GZipMiddleware's, including its random-length header padding against
+    BREACH, which matters for HTML pages carrying a CSRF token next to reflected input.
+    Brotli has no such padding, so it is kept to JSON: API responses are authorized by
+    the ``Authorization`` header, which a cross-site page can't make a browser attach.
+    """
+
+    accepts_br = re.compile(r"\bbr\b")
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+
+    def process_response(self, request, response):
+        if (response.streaming or response.has_header("Content-Encoding")
+                or len(response.content) < self.min_size):
+            return response
+        if (brotli is None or not response.get("Content-Type", "").startswith("application/json")
+                or not self.accepts_br.search(request.headers.get("Accept-Encoding", ""))):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        body = brotli.compress(response.content, quality=5)
+        if len(body) >= len(response.content):
+            return response
+        response.content = body
+        response["Content-Length"] = str(len(body))
+        response["Content-Encoding"] = "br"
+        # The compressed bytes differ from the original representation
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.6 on 2026-10-19 07:31
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_expense_receipt_url_expense_tags_expense_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('as_of', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-as_of'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'timestamp'], name='api_transac_user_id_b012b1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['main_account', 'timestamp'], name='api_transac_main_ac_56cdff_idx'),
+        ),
+        migrations.AddField(
+            model_name='balancecheckpoint',
+            name='main_account',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='api.mainaccount'),
+        ),
+        migrations.AddField(
+            model_name='balancecheckpoint',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='api.project'),
+        ),
+        migrations.AddField(
+            model_name='balancecheckpoint',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='balancecheckpoint',
+            index=models.Index(fields=['main_account', '-as_of'], name='api_balance_main_ac_a9766c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='balancecheckpoint',
+            index=models.Index(fields=['project', '-as_of'], name='api_balance_project_4a58ff_idx'),
+        ),
+    ]
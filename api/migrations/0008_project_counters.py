@@ -0,0 +1,65 @@
+# Generated by Django 5.1.6 on 2026-10-19 07:33
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, F, Func, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+MONEY = models.DecimalField(max_digits=15, decimal_places=2)
+
+
+def _sum(queryset, delta):
+    total = queryset.annotate(total=Func(delta, function="SUM")).values("total")
+    return Coalesce(Subquery(total, output_field=MONEY), Value(Decimal("0.00")), output_field=MONEY)
+
+
+def backfill_counters(apps, schema_editor):
+    # Same subqueries as `manage.py repair_project_counters`, against this migration's schema
+    Project = apps.get_model('api', 'Project')
+    Expense = apps.get_model('api', 'Expense')
+    Transaction = apps.get_model('api', 'Transaction')
+    db = schema_editor.connection.alias
+    project = OuterRef("pk")
+    expenses = Expense.objects.using(db).filter(project=project)
+    transactions = Transaction.objects.using(db).filter(
+        Q(project_id=project) | Q(from_project_id=project) | Q(to_project_id=project))
+    funding = Case(
+        When(project_id=project, transaction_type="allocate", then=F("amount")),
+        When(to_project_id=project, transaction_type="transfer", then=F("amount")),
+        When(from_project_id=project, transaction_type="transfer", then=-F("amount")),
+        default=Value(Decimal("0.00")),
+        output_field=MONEY,
+    )
+    expense_count = expenses.annotate(n=Func(F("id"), function="COUNT")).values("n")
+    Project.objects.using(db).update(
+        total_spent=_sum(expenses, F("amount")),
+        total_allocated=_sum(transactions, funding),
+        expense_count=Coalesce(Subquery(expense_count, output_field=models.IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_balancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='expense_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='total_allocated',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='total_spent',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-19 07:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_project_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='alert_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='budgetalert',
+            index=models.Index(fields=['user', 'is_read', 'created_at'], name='api_budgeta_user_id_7bb9df_idx'),
+        ),
+    ]
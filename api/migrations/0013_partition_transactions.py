@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from api import partitioning
+
+
+def partition(apps, schema_editor):
+    # PostgreSQL only; SQLite keeps the plain table
+    partitioning.partition_table(schema_editor.connection)
+
+
+def unpartition(apps, schema_editor):
+    partitioning.unpartition_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_transactionarchive'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.6 on 2026-10-19 08:00
+
+import api.models
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_recurringschedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a three-letter ISO 4217 currency code.')]),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='original_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='mainaccount',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a three-letter ISO 4217 currency code.')]),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a three-letter ISO 4217 currency code.')]),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='counter_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a three-letter ISO 4217 currency code.')]),
+        ),
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=10, max_digits=20)),
+            ],
+            options={
+                'unique_together': {('currency', 'date')},
+            },
+        ),
+    ]
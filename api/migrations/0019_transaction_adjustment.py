@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_admin_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('deposit', 'Deposit'), ('allocate', 'Allocate to Project'), ('expense', 'Expense'), ('transfer', 'Transfer Between Projects'), ('refund', 'Refund'), ('adjustment', 'Budget Adjustment')], max_length=10),
+        ),
+    ]
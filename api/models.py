@@ -1,8 +1,15 @@
 import uuid
+from django.conf import settings
+from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models.functions import Now
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import get_user_model
 
+from . import sharding
+
 
 # class User(AbstractUser):
 #     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -10,11 +17,48 @@ from django.contrib.auth import get_user_model
 class User(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     email = models.EmailField(unique=True)
+    # Database alias holding this user's data (the shard map); see api/sharding.py
+    shard = models.CharField(max_length=64, blank=True, db_index=True)
+
+    def save(self, *args, **kwargs):
+        if not self.shard:
+            self.shard = sharding.shard_for_new_user(self.pk)
+        super().save(*args, **kwargs)
+        if self._state.db == sharding.DEFAULT_DB and self.shard != sharding.DEFAULT_DB:
+            sharding.mirror_user(self, self.shard)
 
     def __str__(self):
         return str(self.username)
 
 
+@receiver(post_delete, sender=User)
+def delete_shard_user(sender, instance, using, **kwargs):
+    """Deleting a user on ``default`` also drops its shard copy, cascading to all of its data"""
+    if using == sharding.DEFAULT_DB and instance.shard not in ("", sharding.DEFAULT_DB):
+        User.objects.using(instance.shard).filter(pk=instance.pk).delete()
+    # The cascade above wrote tombstones nobody will sync
+    SyncTombstone.objects.using(using).filter(user_id=instance.pk).delete()
+
+
+def default_currency():
+    return settings.DEFAULT_CURRENCY
+
+
+def currency_field(**kwargs):
+    """ISO 4217 code of the amounts on a row"""
+    return models.CharField(
+        max_length=3, default=default_currency,
+        validators=[RegexValidator(r'^[A-Z]{3}$', "Use a three-letter ISO 4217 currency code.")], **kwargs)
+
+
+class SyncedQuerySet(models.QuerySet):
+    """Bulk ``update()`` bypasses ``auto_now``; stamp ``updated_at`` so delta sync sees the change"""
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', Now())
+        return super().update(**kwargs)
+
+
 class Category(models.Model):
     CATEGORY_TYPES = [
         ("expense", "Expense"),
@@ -28,10 +72,16 @@ class Category(models.Model):
     color = models.CharField(max_length=7, default="#3498db")  # Hex color code
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SyncedQuerySet.as_manager()
     
     class Meta:
         verbose_name_plural = "Categories"
         unique_together = ['user', 'name']  # Prevent duplicate category names per user
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.name}"
@@ -43,6 +93,7 @@ class MainAccount(models.Model):
         User, on_delete=models.CASCADE, related_name="main_account")
     balance = models.DecimalField(
         max_digits=12, decimal_places=2, default=0.00)
+    currency = currency_field()
 
     objects = models.Manager()  # Explicitly define the manager
 
@@ -50,6 +101,41 @@ class MainAccount(models.Model):
         return f"{self.user.username}'s Main Account"  # pylint: disable=no-member
 
 
+def _percentage_at_most(percent):
+    """SQL for ``budget / budget_limit * 100 <= percent`` without dividing (limit != 0)"""
+    factor = 100 // percent
+    return (
+        models.Q(budget_limit__gt=0, budget_limit__gte=models.F('budget') * factor)
+        | models.Q(budget_limit__lt=0, budget_limit__lte=models.F('budget') * factor)
+    )
+
+
+class ProjectQuerySet(SyncedQuerySet):
+    BUDGET_STATUSES = ["critical", "low", "medium", "good", "unlimited"]
+
+    def with_budget_status(self):
+        """Annotate ``status``, ``status_rank`` and ``budget_low`` (mirrors
+        Project.budget_status() / is_budget_low()) so they can be filtered and sorted in SQL"""
+        unlimited = models.Q(budget_limit__isnull=True) | models.Q(budget_limit=0)
+        status = models.Case(
+            models.When(unlimited, then=models.Value("unlimited")),
+            models.When(_percentage_at_most(10), then=models.Value("critical")),
+            models.When(_percentage_at_most(25), then=models.Value("low")),
+            models.When(_percentage_at_most(50), then=models.Value("medium")),
+            default=models.Value("good"),
+            output_field=models.CharField(),
+        )
+        status_rank = models.Case(
+            *[models.When(status=name, then=models.Value(rank)) for rank, name in enumerate(self.BUDGET_STATUSES)],
+            output_field=models.IntegerField(),
+        )
+        return self.annotate(
+            status=status,
+            budget_low=models.ExpressionWrapper(
+                models.Q(budget__lte=models.F('low_budget_threshold')), output_field=models.BooleanField()),
+        ).annotate(status_rank=status_rank)
+
+
 class Project(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
@@ -58,13 +144,37 @@ class Project(models.Model):
     budget = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     budget_limit = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
     low_budget_threshold = models.DecimalField(max_digits=15, decimal_places=2, default=50.00)
+    currency = currency_field()  # Of budget, limits and counters; fixed once created
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Denormalized counters, updated in the same DB transaction as budget
+    # (repair with `manage.py repair_project_counters`)
+    total_spent = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    total_allocated = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    expense_count = models.PositiveIntegerField(default=0)
+
+    objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+        ]
     
     def is_budget_low(self):
         """Check if project budget is below the low threshold"""
         return self.budget <= self.low_budget_threshold
     
+    def budget_alerts_due(self):
+        """``[(alert_type, message)]`` the current budget calls for"""
+        alerts = []
+        if self.is_budget_low():
+            alerts.append(("low_budget", f"Project '{self.name}' budget is running low (${self.budget} remaining)"))
+        if self.budget <= 0:
+            alerts.append(("no_funds", f"Project '{self.name}' has no remaining budget"))
+        return alerts
+    
     def budget_status(self):
         """Get budget status with percentage remaining"""
         if self.budget_limit:
@@ -90,6 +200,7 @@ class Transaction(models.Model):
         ("expense", "Expense"),
         ("transfer", "Transfer Between Projects"),
         ("refund", "Refund"),
+        ("adjustment", "Budget Adjustment"),  # Project budget set directly; signed amount
     ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -109,33 +220,192 @@ class Transaction(models.Model):
     transaction_type = models.CharField(
         max_length=10, choices=TRANSACTION_TYPES)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
+    currency = currency_field()  # Of ``amount``: the paying account's currency
+    # Amount the receiving project got, in its own currency, when that differs
+    # (cross-currency allocations and transfers)
+    counter_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     description = models.TextField(blank=True)
     reference_id = models.CharField(max_length=100, blank=True)  # For tracking related transactions
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp']),
+            models.Index(fields=['main_account', 'timestamp']),
+            models.Index(fields=['timestamp']),  # Newest-first listings across users (admin)
+        ]
+
     def __str__(self):
         return f"{self.transaction_type} - {self.amount} - {self.timestamp.strftime('%Y-%m-%d')}"
 
 
+class TransactionArchive(models.Model):
+    """One user's transactions for one month, moved out of the database into a gzipped JSONL file.
+
+    ``totals`` holds ``{transaction_type: {"count": n, "amount": "x"}}`` so whole-month
+    summaries don't need to open the file. See api/archive.py.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="transaction_archives")
+    month = models.DateField()  # First day of the month (UTC)
+    path = models.CharField(max_length=255)  # Relative to TRANSACTION_ARCHIVE_ROOT
+    row_count = models.PositiveIntegerField()
+    totals = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-month']
+        unique_together = ['user', 'month']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.month:%Y-%m} ({self.row_count} transactions)"
+
+
+class FxRate(models.Model):
+    """Value of one unit of ``currency`` in FX_BASE_CURRENCY on ``date`` (shared by all users)"""
+    currency = models.CharField(max_length=3)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+
+    class Meta:
+        unique_together = ['currency', 'date']
+
+    def __str__(self):
+        return f"{self.currency} {self.date:%Y-%m-%d} = {self.rate} {settings.FX_BASE_CURRENCY}"
+
+
+class BalanceCheckpoint(models.Model):
+    """Snapshot of a main account or project balance at a point in time.
+
+    ``balance`` includes every transaction with ``timestamp < as_of``, so a
+    historical balance is the nearest checkpoint plus the transactions after it.
+    Exactly one of ``main_account`` / ``project`` is set.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="balance_checkpoints")
+    main_account = models.ForeignKey(
+        MainAccount, on_delete=models.CASCADE, null=True, blank=True, related_name="checkpoints")
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, null=True, blank=True, related_name="checkpoints")
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    as_of = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-as_of']
+        indexes = [
+            models.Index(fields=['main_account', '-as_of']),
+            models.Index(fields=['project', '-as_of']),
+        ]
+
+    def __str__(self):
+        owner = self.project or self.main_account
+        return f"{owner} @ {self.as_of:%Y-%m-%d %H:%M} - {self.balance}"
+
+
 class Expense(models.Model):
     id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False)
     project = models.ForeignKey(
         "Project", on_delete=models.CASCADE, related_name="expenses")
     category = models.ForeignKey(
         Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="expenses")
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)  # In the project's currency
+    # Currency the expense was paid in, and the amount in it when that isn't the project's
+    currency = currency_field()
+    original_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     description = models.TextField()
     receipt_url = models.URLField(blank=True)  # For receipt storage
+    receipt_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of an uploaded Receipt
     tags = models.CharField(max_length=255, blank=True)  # Comma-separated tags
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SyncedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'updated_at']),
+            models.Index(fields=['created_at']),  # Newest-first listings across users (admin)
+        ]
+
     def __str__(self):
         return f"{self.amount} - {self.description}"
     
     def get_tags_list(self):
         """Return tags as a list"""
-        return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
+        return self.split_tags(self.tags)
+
+    @staticmethod
+    def split_tags(tags):
+        return [tag.strip() for tag in tags.split(',') if tag.strip()]
+
+
+class RecurringSchedule(models.Model):
+    """A repeating expense or allocation (rent, subscriptions, monthly funding).
+
+    ``next_run`` is the date of the next occurrence not yet posted; the
+    ``run_recurring_schedules`` command posts every due occurrence and moves it on
+    (see api/recurring.py).
+    """
+    KINDS = [
+        ("expense", "Expense"),
+        ("allocate", "Allocate to Project"),
+    ]
+    FREQUENCIES = [
+        ("daily", "Daily"),
+        ("weekly", "Weekly"),
+        ("monthly", "Monthly"),
+        ("yearly", "Yearly"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="recurring_schedules")
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="recurring_schedules")
+    category = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="recurring_schedules")
+    kind = models.CharField(max_length=10, choices=KINDS)
+    # In the main account's currency for allocations, the project's for expenses
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    description = models.TextField(blank=True)
+    tags = models.CharField(max_length=255, blank=True)  # Copied onto each expense
+    frequency = models.CharField(max_length=10, choices=FREQUENCIES, default="monthly")
+    interval = models.PositiveSmallIntegerField(default=1)  # Every N days / weeks / months / years
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    next_run = models.DateField()
+    last_run = models.DateField(null=True, blank=True)
+    last_error = models.CharField(max_length=255, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['next_run']
+        indexes = [
+            models.Index(fields=['is_active', 'next_run']),
+            models.Index(fields=['user', 'next_run']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.amount} {self.frequency} - {self.project.name}"
+
+
+class Receipt(models.Model):
+    """A receipt file a user uploaded; the bytes live once per hash under RECEIPT_ROOT (api/receipts.py)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="receipts")
+    sha256 = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100)
+    filename = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ['user', 'sha256']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.filename or self.sha256[:12]} ({self.size} bytes)"
 
 
 class BudgetAlert(models.Model):
@@ -153,9 +423,115 @@ class BudgetAlert(models.Model):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SyncedQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read', 'created_at']),
+            models.Index(fields=['user', 'updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.alert_type} - {self.project.name}"
+
+
+class AlertCounter(models.Model):
+    """Per-user alert totals kept in step with BudgetAlert writes, so polling never COUNTs rows"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="alert_counter")
+    unread_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def adjust(cls, user, unread=0, total=0):
+        """Apply a delta after the alert rows were written; rebuilds if the row doesn't exist yet.
+        ``user`` may be a User or its id"""
+        if not cls.objects.filter(user=user).update(
+                unread_count=models.F('unread_count') + unread,
+                total_count=models.F('total_count') + total):
+            cls.rebuild(user)
+
+    @classmethod
+    def rebuild(cls, user):
+        """Recount from BudgetAlert (used for users that predate the counters)"""
+        user_id = getattr(user, 'pk', user)
+        counts = BudgetAlert.objects.filter(user_id=user_id).aggregate(
+            total=models.Count('id'), unread=models.Count('id', filter=models.Q(is_read=False)))
+        counter, _ = cls.objects.update_or_create(
+            user_id=user_id, defaults={"unread_count": counts['unread'], "total_count": counts['total']})
+        return counter
+
+    def __str__(self):
+        return f"{self.user.username} - {self.unread_count}/{self.total_count} unread"
+
+
+class DataVersion(models.Model):
+    """Per-user change counter bumped on every write; the ETag of polled endpoints derives from it"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="data_version")
+    version = models.PositiveBigIntegerField(default=1)
+
+    @classmethod
+    def current(cls, user):
+        """``user`` may be a User or its id"""
+        user_id = getattr(user, 'pk', user)
+        version = cls.objects.filter(pk=user_id).values_list('version', flat=True).first()
+        if version is None:
+            version = cls.objects.get_or_create(user_id=user_id)[0].version
+        return version
+
+    @classmethod
+    def bump(cls, user):
+        """``user`` may be a User or its id"""
+        user_id = getattr(user, 'pk', user)
+        if not cls.objects.filter(pk=user_id).update(version=models.F('version') + 1):
+            cls.objects.get_or_create(user_id=user_id)
+
+    def __str__(self):
+        return f"{self.user.username} - v{self.version}"
+
+
+class SyncTombstone(models.Model):
+    """A deleted Project, Category, Expense or BudgetAlert, kept so delta sync can report it.
+
+    Pruned after SYNC_TOMBSTONE_DAYS (``manage.py prune_sync_tombstones``); no FK
+    constraint on ``user`` so tombstones written while a user is deleted don't block it.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    collection = models.CharField(max_length=20)  # Key in the /api/sync/ response
+    object_id = models.UUIDField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.collection} {self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=BudgetAlert)
+def record_tombstone(sender, instance, using, **kwargs):
+    SyncTombstone.objects.using(using).create(
+        user_id=instance.user_id, collection=SYNC_COLLECTIONS[sender], object_id=instance.pk)
+
+
+@receiver(post_delete, sender=Expense)
+def record_expense_tombstone(sender, instance, using, **kwargs):
+    # Runs before the owning project's row goes when a project delete cascades
+    user_id = Project._base_manager.using(using).filter(
+        pk=instance.project_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        SyncTombstone.objects.using(using).create(
+            user_id=user_id, collection="expenses", object_id=instance.pk)
+
+
+SYNC_COLLECTIONS = {Project: "projects", Category: "categories", BudgetAlert: "budget_alerts"}
@@ -0,0 +1,77 @@
+from functools import partial
+
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from . import counts
+
+
+class ApproximatePage(Page):
+    def has_next(self):
+        return self.more
+
+
+class ApproximateCountPaginator(Paginator):
+    """``count`` may be an estimate (api/counts.py), so pages never rely on it: each
+    fetches one row more than it shows to know whether there is a next page."""
+
+    def __init__(self, *args, exact=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.exact = exact
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        count, self.count_is_exact = counts.approximate_count(self.object_list, exact=self.exact)
+        return count
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return super().validate_number(number)
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        page = ApproximatePage(rows[:self.per_page], number, self)
+        page.more = len(rows) > self.per_page
+        return page
+
+
+class StandardPagination(PageNumberPagination):
+    """?page=N&page_size=M, capped so a single page stays cheap.
+
+    ``count`` is estimated for large results (``count_is_exact`` says which);
+    ``?exact_count=true`` asks for an exact ``COUNT(*)``.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(ApproximateCountPaginator, exact=counts.wants_exact(request))
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        return Response({
+            'count': paginator.count,
+            'count_is_exact': paginator.count_is_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count_is_exact'] = {'type': 'boolean', 'example': True}
+        return schema
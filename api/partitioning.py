@@ -0,0 +1,149 @@
+"""
+Monthly range partitioning of the transaction table on PostgreSQL.
+
+``api_transaction`` becomes ``PARTITION BY RANGE (timestamp)`` with one child table per
+UTC month (``api_transaction_2025_01``, ...) and a default partition catching anything
+outside them. Date-filtered history queries then only scan the matching months, and
+archiving a month is a ``DETACH``/``DROP`` instead of a bulk ``DELETE`` plus vacuum.
+
+Other backends (SQLite in development) keep the plain table; every helper here is a
+no-op there.
+"""
+from datetime import date
+
+from django.utils import timezone
+
+TABLE = "api_transaction"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def supported(connection):
+    return connection.vendor == "postgresql"
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_{month:%Y_%m}"
+
+
+def is_partitioned(connection):
+    if not supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def partitions(connection):
+    """``{month: table name}`` of the attached monthly partitions"""
+    if not is_partitioned(connection):
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)", [TABLE])
+        names = [row[0] for row in cursor.fetchall()]
+    months = {}
+    for name in names:
+        suffix = name[len(TABLE) + 1:]
+        if name != DEFAULT_PARTITION and len(suffix) == 7:
+            year, month = suffix.split("_")
+            months[date(int(year), int(month), 1)] = name
+    return months
+
+
+def _bounds(month):
+    return f"{month:%Y-%m-%d} 00:00:00+00", f"{add_months(month, 1):%Y-%m-%d} 00:00:00+00"
+
+
+def create_partition(connection, month):
+    """Attach the partition for ``month``, moving any rows the default partition holds for it"""
+    name = partition_name(month)
+    lower, upper = _bounds(month)
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+            f'WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved', [lower, upper])
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM ('{lower}') TO ('{upper}')")
+    return name
+
+
+def ensure_partitions(connection, first_month, last_month):
+    """Create the missing monthly partitions between two months (inclusive); returns their names"""
+    if not is_partitioned(connection):
+        return []
+    existing = partitions(connection)
+    created = []
+    month = first_month
+    while month <= last_month:
+        if month not in existing:
+            created.append(create_partition(connection, month))
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partition(connection, month):
+    """Detach and drop ``month``'s partition; False when there is no such partition"""
+    name = partitions(connection).get(month)
+    if name is None:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+        cursor.execute(f'DROP TABLE "{name}"')
+    return True
+
+
+def _rebuild(connection, partitioned, months_ahead=3):
+    """Recreate the table (partitioned or plain) around the existing rows, keeping
+    Django's index and foreign key names so later migrations still find them"""
+    old = f"{TABLE}_old"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [TABLE, f"{TABLE}_pkey"])
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'", [TABLE])
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            f'SELECT date_trunc(\'month\', MIN("timestamp") AT TIME ZONE \'UTC\')::date FROM "{TABLE}"')
+        first_month = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{old}"')
+        partition_by = ' PARTITION BY RANGE ("timestamp")' if partitioned else ""
+        cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{old}" INCLUDING DEFAULTS){partition_by}')
+        if partitioned:
+            cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+            today = timezone.now().date().replace(day=1)
+            ensure_partitions(connection, first_month or today, add_months(today, months_ahead))
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{old}"')
+        cursor.execute(f'DROP TABLE "{old}"')
+
+        # Unique constraints on a partitioned table must include the partition key
+        key = '"id", "timestamp"' if partitioned else '"id"'
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY ({key})')
+        # Definitions were read before the rename, so they already name the new table
+        for name, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+
+
+def partition_table(connection):
+    if supported(connection) and not is_partitioned(connection):
+        _rebuild(connection, partitioned=True)
+
+
+def unpartition_table(connection):
+    if is_partitioned(connection):
+        _rebuild(connection, partitioned=False)
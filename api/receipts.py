@@ -0,0 +1,113 @@
+"""
+Content-addressed receipt storage on the local filesystem.
+
+Each file is stored once under ``RECEIPT_ROOT/<aa>/<bb>/<sha256>``, however many users
+or expenses reference it. Uploads are streamed in chunks into a temporary file while
+being hashed, then renamed into place (or dropped when that content already exists),
+so nothing holds a whole file in memory. Content never changes under a hash, which
+makes the served files safe to cache forever.
+"""
+import hashlib
+import os
+import re
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class TooLarge(Exception):
+    pass
+
+
+def root():
+    return Path(settings.RECEIPT_ROOT)
+
+
+def path_for(sha256):
+    return root() / sha256[:2] / sha256[2:4] / sha256
+
+
+def store(chunks, max_size=None):
+    """Write an iterable of byte chunks; returns ``(sha256, size, created)``.
+
+    Raises TooLarge (leaving nothing behind) once more than ``max_size`` bytes arrive.
+    """
+    max_size = max_size or settings.RECEIPT_MAX_SIZE
+    tmp_dir = root() / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp = tmp_dir / uuid.uuid4().hex
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    raise TooLarge(f"Receipts are limited to {max_size} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+        sha256 = digest.hexdigest()
+        path = path_for(sha256)
+        if path.exists():
+            return sha256, size, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic: a concurrent upload of the same bytes just replaces it with identical content
+        os.replace(tmp, path)
+        return sha256, size, True
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def read_stream(stream):
+    """Chunks of a file-like request body (None for an empty body)"""
+    if stream is None:
+        return
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_range(header, size):
+    """``(start, end)`` (inclusive) for a single ``Range: bytes=`` header.
+
+    Returns None to serve the whole file (no header, or a form we don't serve
+    partially, e.g. multiple ranges) and raises ValueError when unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def iter_range(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
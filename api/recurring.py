@@ -0,0 +1,209 @@
+"""
+Recurring expenses and allocations: expanding schedules into occurrences and posting
+every due one in set-based batches (``manage.py run_recurring_schedules``).
+
+Each batch of due schedules is posted in one database transaction:
+
+- the schedules are locked with ``SKIP LOCKED``, so concurrent runs take disjoint batches;
+- their occurrences are expanded oldest first and checked in memory against the locked
+  main account balances and project budgets, allocations before expenses on the same
+  day. A schedule stops at the first occurrence it can't cover and stays due from that
+  date, with ``last_error`` set, so the next run retries it;
+- balances and project counters move with one UPDATE per table, expenses and
+  transactions are bulk-inserted, and ``next_run`` advances in the same transaction.
+
+Posted occurrences are no longer due, so re-running is a no-op, and a run after
+downtime posts every missed date exactly once. Transactions carry the posting time,
+not the due date (a backdated row would slip under existing balance checkpoints);
+the due date is in the description and in ``reference_id``.
+"""
+import calendar
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from . import fx, ledger, sharding
+from .models import (AlertCounter, BudgetAlert, DataVersion, Expense, MainAccount, Project,
+                     RecurringSchedule, Transaction)
+
+
+def add_months(day, count, anchor_day):
+    """``day`` moved ``count`` months, on ``anchor_day`` or the month's last day if shorter"""
+    index = day.year * 12 + day.month - 1 + count
+    year, month = index // 12, index % 12 + 1
+    return date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+
+
+def following(schedule, day):
+    """The occurrence after ``day``"""
+    if schedule.frequency == "daily":
+        return day + timedelta(days=schedule.interval)
+    if schedule.frequency == "weekly":
+        return day + timedelta(weeks=schedule.interval)
+    months = schedule.interval * (12 if schedule.frequency == "yearly" else 1)
+    # Anchored on the start date so the 31st stays the 31st after a short month
+    return add_months(day, months, schedule.start_date.day)
+
+
+def occurrences(schedule, until):
+    """Dates from ``next_run`` up to ``until`` (and ``end_date``)"""
+    day = schedule.next_run
+    while day <= until and (schedule.end_date is None or day <= schedule.end_date):
+        yield day
+        day = following(schedule, day)
+
+
+def due(today):
+    return RecurringSchedule.objects.filter(is_active=True, next_run__lte=today)
+
+
+def post_due(today=None, batch_size=500):
+    """Post every occurrence due on or before ``today`` on the active shard.
+
+    Returns ``{"schedules": n, "occurrences": n, "failed": n}``.
+    """
+    today = today or timezone.localdate()
+    totals = {"schedules": 0, "occurrences": 0, "failed": 0}
+    last_pk = None
+    while True:
+        with transaction.atomic(using=sharding.active_db()):
+            batch = due(today).order_by("pk")
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            batch = list(batch.select_for_update(skip_locked=True)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            posted, failed = _post_batch(batch, today)
+        totals["schedules"] += len(batch)
+        totals["occurrences"] += posted
+        totals["failed"] += failed
+    return totals
+
+
+def _post_batch(schedules, today):
+    user_ids = {schedule.user_id for schedule in schedules}
+    # Locked in pk order so concurrent writers can't deadlock against us
+    accounts = {account.user_id: account for account in
+                MainAccount.objects.select_for_update().filter(user_id__in=user_ids).order_by("pk")}
+    projects = {project.pk: project for project in
+                Project.objects.select_for_update().filter(
+                    pk__in={schedule.project_id for schedule in schedules}).order_by("pk")}
+    balances = {user_id: account.balance for user_id, account in accounts.items()}
+    # Cross-currency allocations convert at the posting day's rate, fetched in one query
+    rates = fx.Rates({account.currency for account in accounts.values()}
+                     | {project.currency for project in projects.values()}, today, today)
+
+    occurrences_due = sorted(
+        ((day, schedule.kind != "allocate", schedule.pk, schedule)
+         for schedule in schedules for day in occurrences(schedule, today)),
+        key=lambda item: item[:3])
+
+    debits, allocated, spent, counts = {}, {}, {}, {}
+    expenses, transactions = [], []
+    last_posted, errors = {}, {}
+    for day, _, pk, schedule in occurrences_due:
+        if pk in errors:
+            continue
+        account = accounts.get(schedule.user_id)
+        project = projects[schedule.project_id]
+        amount = schedule.amount
+        reference_id = f"recurring:{pk}:{day.isoformat()}"
+        if account is None:
+            errors[pk] = (day, "Main account not found")
+            continue
+
+        counter_amount = None
+        if schedule.kind == "allocate":
+            if balances[schedule.user_id] < amount:
+                errors[pk] = (day, "Insufficient funds")
+                continue
+            try:
+                received = rates.convert(amount, account.currency, project.currency, today)
+            except fx.MissingRate as e:
+                errors[pk] = (day, str(e))
+                continue
+            if project.currency != account.currency:
+                counter_amount = received
+            balances[schedule.user_id] -= amount
+            project.budget += received
+            debits[account.pk] = debits.get(account.pk, ledger.ZERO) + amount
+            allocated[project.pk] = allocated.get(project.pk, ledger.ZERO) + received
+            currency = account.currency
+            description = f"Allocated funds to {project.name} (due {day:%Y-%m-%d})"
+        else:
+            if project.budget < amount:
+                errors[pk] = (day, "Insufficient project budget")
+                continue
+            project.budget -= amount
+            spent[project.pk] = spent.get(project.pk, ledger.ZERO) + amount
+            counts[project.pk] = counts.get(project.pk, 0) + 1
+            expense_description = schedule.description or "Recurring expense"
+            expenses.append(Expense(
+                project_id=project.pk, category_id=schedule.category_id, amount=amount,
+                currency=project.currency, description=expense_description, tags=schedule.tags))
+            currency = project.currency
+            description = f"Expense: {expense_description} (due {day:%Y-%m-%d})"
+
+        transactions.append(Transaction(
+            user_id=schedule.user_id, project_id=project.pk, main_account=account,
+            transaction_type=schedule.kind, amount=amount, currency=currency,
+            counter_amount=counter_amount, description=description,
+            reference_id=reference_id))
+        last_posted[pk] = day
+
+    if debits:
+        MainAccount.objects.filter(pk__in=debits).update(balance=F("balance") - ledger.amount_by_pk(debits))
+    if allocated or spent:
+        Project.objects.filter(pk__in=allocated.keys() | spent.keys()).update(
+            budget=F("budget") + ledger.amount_by_pk(allocated) - ledger.amount_by_pk(spent),
+            total_allocated=F("total_allocated") + ledger.amount_by_pk(allocated),
+            total_spent=F("total_spent") + ledger.amount_by_pk(spent),
+            expense_count=F("expense_count") + Case(
+                *[When(pk=pk, then=Value(n)) for pk, n in counts.items()],
+                default=Value(0), output_field=IntegerField()),
+        )
+    Expense.objects.bulk_create(expenses)
+    Transaction.objects.bulk_create(transactions)
+    _create_budget_alerts([projects[pk] for pk in spent])
+
+    now = timezone.now()
+    for schedule in schedules:
+        if schedule.pk in last_posted:
+            schedule.last_run = last_posted[schedule.pk]
+            schedule.next_run = following(schedule, schedule.last_run)
+        if schedule.pk in errors:
+            schedule.next_run, schedule.last_error = errors[schedule.pk]
+        else:
+            schedule.last_error = ""
+        if schedule.end_date is not None and schedule.next_run > schedule.end_date:
+            schedule.is_active = False
+        schedule.updated_at = now
+    RecurringSchedule.objects.bulk_update(
+        schedules, ["next_run", "last_run", "last_error", "is_active", "updated_at"])
+
+    changed_users = {schedule.user_id for schedule in schedules if schedule.pk in last_posted}
+    DataVersion.objects.filter(pk__in=changed_users).update(version=F("version") + 1)
+    return len(transactions), len(errors)
+
+
+def _create_budget_alerts(projects):
+    """AddExpenseView's budget alerts for the projects expenses were posted to, in bulk"""
+    wanted = [(project, alert_type, message)
+              for project in projects for alert_type, message in project.budget_alerts_due()]
+    if not wanted:
+        return
+    existing = set(BudgetAlert.objects.filter(
+        project__in=[project for project, _, _ in wanted],
+        alert_type__in={alert_type for _, alert_type, _ in wanted},
+    ).values_list("project_id", "alert_type"))
+    alerts = [BudgetAlert(user_id=project.user_id, project=project, alert_type=alert_type, message=message)
+              for project, alert_type, message in wanted if (project.pk, alert_type) not in existing]
+    BudgetAlert.objects.bulk_create(alerts)
+    created = {}
+    for alert in alerts:
+        created[alert.user_id] = created.get(alert.user_id, 0) + 1
+    for user_id, count in created.items():
+        AlertCounter.adjust(user_id, unread=count, total=count)
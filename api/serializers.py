@@ -2,8 +2,12 @@ from .models import Project, MainAccount
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
-from .models import MainAccount, Project, Expense, Category, Transaction, BudgetAlert
+from .models import MainAccount, Project, Expense, Category, Transaction, BudgetAlert, RecurringSchedule, Receipt
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+
+from . import sharding
 
 
 User = get_user_model()
@@ -14,10 +18,12 @@ class UserSignupSerializer(serializers.ModelSerializer):
     username = serializers.CharField(
         required=True)  # Ensure username is required
     password = serializers.CharField(write_only=True)
+    # Main account currency (default settings.DEFAULT_CURRENCY)
+    currency = serializers.RegexField(r'^[A-Z]{3}$', write_only=True, required=False)
 
     class Meta:
         model = User
-        fields = ["id", "username", "email", "password"]
+        fields = ["id", "username", "email", "password", "currency"]
 
     def validate_username(self, value):
         if User.objects.filter(username=value).exists():
@@ -31,10 +37,17 @@ class UserSignupSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data["password"] = make_password(validated_data["password"])
+        currency = validated_data.pop("currency", None) or settings.DEFAULT_CURRENCY
         user = User.objects.create(**validated_data)
 
+        with sharding.use_shard(user.shard):
+            self._create_account_data(user, currency)
+
+        return user
+
+    def _create_account_data(self, user, currency):
         # Automatically create a MainAccount for the new user
-        MainAccount.objects.create(user=user)
+        MainAccount.objects.create(user=user, currency=currency)
         
         # Create default expense categories
         default_categories = [
@@ -55,7 +68,83 @@ class UserSignupSerializer(serializers.ModelSerializer):
                 type="expense"
             )
 
-        return user
+
+class SparseFieldsMixin:
+    """?fields=a,b / ?exclude=c for reads: omitted fields are dropped before serialization
+    (and, on the values() fast path, never fetched)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        keep = self.requested_fields(request, self.fields.keys())
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields(cls, request, available):
+        names = set(available)
+        fields = request.query_params.get('fields')
+        exclude = request.query_params.get('exclude')
+        if fields:
+            names &= {name.strip() for name in fields.split(',')}
+        if exclude:
+            names -= {name.strip() for name in exclude.split(',')}
+        return names
+
+
+class ValuesFastPathMixin:
+    """Read-only fast path: rows come from ``.values()`` with joined names resolved in SQL
+    and are formatted by this serializer's own fields, without instantiating models.
+
+    ``values_computed`` maps each SerializerMethodField to ``(lookups, func(row))``.
+    The output is identical to ``Serializer(queryset, many=True).data``.
+    """
+    values_computed = {}
+
+    @classmethod
+    def fast_data(cls, queryset, request=None):
+        lookups, plan = cls._values_plan(request)
+        return cls._format(queryset.values(*lookups), plan)
+
+    @classmethod
+    def format_rows(cls, rows, request=None):
+        """Format already-fetched rows that carry every lookup ``fast_data`` would request"""
+        return cls._format(rows, cls._values_plan(request)[1])
+
+    @classmethod
+    def _values_plan(cls, request):
+        fields = cls(context={'request': request} if request is not None else {}).fields
+        lookups, plan = set(), []
+        for name, field in fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in cls.values_computed:
+                    raise ImproperlyConfigured(f"{cls.__name__}.values_computed has no entry for '{name}'")
+                needs, func = cls.values_computed[name]
+                lookups.update(needs)
+                plan.append((name, None, func))
+            else:
+                lookups.add(field.source)
+                # Related fields render their pk, which values() already returns
+                fmt = None if isinstance(field, serializers.RelatedField) else field.to_representation
+                plan.append((name, field.source, fmt))
+        return lookups, plan
+
+    @staticmethod
+    def _format(rows, plan):
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, fmt in plan:
+                if source is None:
+                    item[name] = fmt(row)
+                else:
+                    value = row[source]
+                    item[name] = value if value is None or fmt is None else fmt(value)
+            data.append(item)
+        return data
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -73,7 +162,7 @@ class CategorySerializer(serializers.ModelSerializer):
         return sum(expense.amount for expense in obj.expenses.all())
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     budget_status = serializers.SerializerMethodField()
     is_budget_low = serializers.SerializerMethodField()
     total_expenses = serializers.SerializerMethodField()
@@ -81,25 +170,40 @@ class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = '__all__'
+        read_only_fields = ['user', 'total_spent', 'total_allocated', 'expense_count']
+    
+    def validate_currency(self, value):
+        # Budget and counters are stored in it; changing it would silently revalue them
+        if self.instance is not None and value != self.instance.currency:
+            raise serializers.ValidationError("A project's currency can't be changed.")
+        return value
     
     def get_budget_status(self, obj):
-        return obj.budget_status()
+        # Prefer the with_budget_status() annotation when the view provided it
+        return getattr(obj, 'status', None) or obj.budget_status()
     
     def get_is_budget_low(self, obj):
-        return obj.is_budget_low()
+        budget_low = getattr(obj, 'budget_low', None)
+        return obj.is_budget_low() if budget_low is None else budget_low
     
     def get_total_expenses(self, obj):
-        return sum(expense.amount for expense in obj.expenses.all())
+        return obj.total_spent
 
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(ValuesFastPathMixin, SparseFieldsMixin, serializers.ModelSerializer):
     from_project_name = serializers.SerializerMethodField()
     to_project_name = serializers.SerializerMethodField()
     project_name = serializers.SerializerMethodField()
     
+    values_computed = {
+        "project_name": (["project__name"], lambda row: row["project__name"]),
+        "from_project_name": (["from_project__name"], lambda row: row["from_project__name"]),
+        "to_project_name": (["to_project__name"], lambda row: row["to_project__name"]),
+    }
+    
     class Meta:
         model = Transaction
-        fields = ["id", "transaction_type", "amount", "description", "reference_id", 
+        fields = ["id", "transaction_type", "amount", "currency", "counter_amount", "description", "reference_id", 
                  "project", "project_name", "from_project", "from_project_name", 
                  "to_project", "to_project_name", "timestamp"]
     
@@ -124,6 +228,17 @@ class BudgetAlertSerializer(serializers.ModelSerializer):
         return obj.project.name
 
 
+class BudgetAlertBulkReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    project_id = serializers.UUIDField(required=False)
+    before = serializers.DateTimeField(required=False)
+    
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError("Provide ids, project_id or before.")
+        return data
+
+
 class ProjectTransferSerializer(serializers.Serializer):
     from_project_id = serializers.UUIDField()
     to_project_id = serializers.UUIDField()
@@ -136,11 +251,29 @@ class ProjectTransferSerializer(serializers.Serializer):
         return data
 
 
+class BatchProjectTransferSerializer(serializers.Serializer):
+    transfers = ProjectTransferSerializer(many=True, allow_empty=False)
+    
+    def validate_transfers(self, value):
+        if any(transfer['amount'] <= 0 for transfer in value):
+            raise serializers.ValidationError("Transfer amounts must be positive.")
+        return value
+
+
 class FundAllocationSerializer(serializers.Serializer):
     project_id = serializers.UUIDField()
     amount = serializers.DecimalField(max_digits=15, decimal_places=2)
 
 
+class BatchFundAllocationSerializer(serializers.Serializer):
+    allocations = FundAllocationSerializer(many=True, allow_empty=False)
+    
+    def validate_allocations(self, value):
+        if any(allocation['amount'] <= 0 for allocation in value):
+            raise serializers.ValidationError("Allocation amounts must be positive.")
+        return value
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -158,16 +291,33 @@ class MainAccountSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(ValuesFastPathMixin, SparseFieldsMixin, serializers.ModelSerializer):
     category_name = serializers.SerializerMethodField()
     category_color = serializers.SerializerMethodField()
     tags_list = serializers.SerializerMethodField()
     project_name = serializers.SerializerMethodField()
     
+    values_computed = {
+        "category_name": (["category__name"], lambda row: row["category__name"]),
+        "category_color": (["category_id", "category__color"],
+                           lambda row: row["category__color"] if row["category_id"] else "#95a5a6"),
+        "tags_list": (["tags"], lambda row: Expense.split_tags(row["tags"])),
+        "project_name": (["project__name"], lambda row: row["project__name"]),
+    }
+    
     class Meta:
         model = Expense
         fields = ["id", "project", "project_name", "category", "category_name", "category_color", 
-                 "amount", "description", "receipt_url", "tags", "tags_list", "created_at", "updated_at"]
+                 "amount", "currency", "original_amount", "description", "receipt_url", "receipt_hash",
+                 "tags", "tags_list", "created_at", "updated_at"]
+        read_only_fields = ["original_amount"]
+    
+    def validate_receipt_hash(self, value):
+        # Only receipts the user uploaded; knowing a hash isn't enough
+        request = self.context.get('request')
+        if value and (request is None or not Receipt.objects.filter(user=request.user, sha256=value).exists()):
+            raise serializers.ValidationError("Unknown receipt; upload it to /api/receipts/ first.")
+        return value
     
     def get_category_name(self, obj):
         return obj.category.name if obj.category else None
@@ -182,6 +332,56 @@ class ExpenseSerializer(serializers.ModelSerializer):
         return obj.project.name
 
 
+class RecurringScheduleSerializer(serializers.ModelSerializer):
+    project_name = serializers.CharField(source='project.name', read_only=True)
+    
+    class Meta:
+        model = RecurringSchedule
+        fields = ["id", "kind", "project", "project_name", "category", "amount", "description", "tags",
+                 "frequency", "interval", "start_date", "end_date", "next_run", "last_run", "last_error",
+                 "is_active", "created_at", "updated_at"]
+        read_only_fields = ["next_run", "last_run", "last_error", "created_at", "updated_at"]
+    
+    def _owned(self, obj):
+        if obj is not None and obj.user_id != self.context['request'].user.pk:
+            raise serializers.ValidationError("Not found.")
+        return obj
+    
+    def validate_project(self, value):
+        return self._owned(value)
+    
+    def validate_category(self, value):
+        return self._owned(value)
+    
+    def validate(self, data):
+        get = lambda field: data.get(field, getattr(self.instance, field, None))
+        if get('amount') is not None and get('amount') <= 0:
+            raise serializers.ValidationError({"amount": "Must be positive."})
+        if get('interval') is not None and get('interval') < 1:
+            raise serializers.ValidationError({"interval": "Must be at least 1."})
+        if get('end_date') and get('start_date') and get('end_date') < get('start_date'):
+            raise serializers.ValidationError({"end_date": "Must not be before start_date."})
+        if get('category') and get('kind') != "expense":
+            raise serializers.ValidationError({"category": "Only expense schedules have a category."})
+        if self.instance is not None and 'start_date' in data and data['start_date'] != self.instance.start_date:
+            if self.instance.last_run:
+                raise serializers.ValidationError(
+                    {"start_date": "Can't move the start of a schedule that has already posted."})
+            data['next_run'] = data['start_date']
+        return data
+    
+    def create(self, validated_data):
+        # Past start dates are caught up by the next scheduler run
+        validated_data['next_run'] = validated_data['start_date']
+        return super().create(validated_data)
+
+
+class ReceiptSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Receipt
+        fields = ["sha256", "size", "content_type", "filename", "created_at"]
+
+
 class ProjectBalanceSerializer(serializers.ModelSerializer):
     total_expenses = serializers.SerializerMethodField()
     remaining_budget = serializers.SerializerMethodField()
@@ -198,28 +398,30 @@ class ProjectBalanceSerializer(serializers.ModelSerializer):
                  "is_budget_low", "alerts_count", "created_at"]
     
     def get_total_expenses(self, obj):
-        """Calculate total expenses for this project"""
-        total = sum(expense.amount for expense in obj.expenses.all())
-        return total
+        """Total expenses for this project (denormalized counter)"""
+        return obj.total_spent
     
     def get_remaining_budget(self, obj):
         """Calculate remaining budget (current budget field already accounts for expenses)"""
         return obj.budget
     
     def get_expense_count(self, obj):
-        """Get total number of expenses for this project"""
-        return obj.expenses.count()
+        """Get total number of expenses for this project (denormalized counter)"""
+        return obj.expense_count
     
     def get_latest_expenses(self, obj):
-        """Get latest 3 expenses for this project"""
-        latest_expenses = obj.expenses.order_by('-created_at')[:3]
+        """Get latest 3 expenses for this project (prefetched by the view when possible)"""
+        latest_expenses = getattr(obj, 'latest_expenses', None)
+        if latest_expenses is None:
+            latest_expenses = obj.expenses.order_by('-created_at')[:3]
         return ExpenseSerializer(latest_expenses, many=True).data
     
     def get_budget_status(self, obj):
-        return obj.budget_status()
+        return getattr(obj, 'status', None) or obj.budget_status()
     
     def get_is_budget_low(self, obj):
-        return obj.is_budget_low()
+        budget_low = getattr(obj, 'budget_low', None)
+        return obj.is_budget_low() if budget_low is None else budget_low
     
     def get_alerts_count(self, obj):
         return obj.alerts.filter(is_read=False).count()
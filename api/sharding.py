@@ -0,0 +1,219 @@
+"""
+User-keyed horizontal sharding.
+
+Every user's rows (accounts, projects, categories, expenses, transactions, alerts, ...)
+live together on one database alias listed in ``settings.DATABASE_SHARDS``. The shard
+map is the ``User.shard`` column on the ``default`` database; a stub copy of the user
+row is kept on its shard so shard-local foreign keys hold.
+
+Requests run against the authenticated user's shard (see ``activate`` and
+``ShardMiddleware``); commands pick a shard explicitly with ``use_shard`` or visit all
+of them with ``fan_out``. With a single database configured everything resolves to
+``default`` without any extra queries.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+
+DEFAULT_DB = "default"
+
+# (model label, lookup of the owning user's id); parents before children for copying.
+# Tombstones come first so they are deleted last: deleting the other rows writes more.
+SHARDED_MODELS = (
+    ("api.synctombstone", "user_id"),
+    ("api.category", "user_id"),
+    ("api.mainaccount", "user_id"),
+    ("api.project", "user_id"),
+    ("api.expense", "project__user_id"),
+    ("api.receipt", "user_id"),
+    ("api.recurringschedule", "user_id"),
+    ("api.transaction", "user_id"),
+    ("api.transactionarchive", "user_id"),
+    ("api.balancecheckpoint", "user_id"),
+    ("api.budgetalert", "user_id"),
+    ("api.alertcounter", "user_id"),
+    ("api.dataversion", "user_id"),
+)
+SHARDED_LABELS = frozenset(label for label, _ in SHARDED_MODELS)
+
+_active = contextvars.ContextVar("active_shard", default=None)
+
+
+def shards():
+    return list(getattr(settings, "DATABASE_SHARDS", None) or [DEFAULT_DB])
+
+
+def is_sharded():
+    return len(shards()) > 1
+
+
+def shard_for_new_user(user_id):
+    """Initial placement: spread new users evenly by id; existing users stay where they are"""
+    aliases = shards()
+    return aliases[user_id.int % len(aliases)]
+
+
+def shard_for_user(user):
+    """Shard alias of a User instance or a user id (one pk lookup on the shard map)"""
+    if not is_sharded():
+        return DEFAULT_DB
+    if getattr(user, "shard", None):
+        return user.shard
+    User = apps.get_model("api", "User")
+    shard = (User.objects.using(DEFAULT_DB).filter(pk=getattr(user, "pk", user))
+             .values_list("shard", flat=True).first())
+    return shard or DEFAULT_DB
+
+
+def active_db():
+    """Database of the current request's user (``default`` outside a shard scope)"""
+    return _active.get() or DEFAULT_DB
+
+
+def activate(alias):
+    _active.set(alias)
+
+
+@contextmanager
+def use_shard(alias):
+    """Route unhinted queries on sharded models to ``alias`` for the duration of the block"""
+    token = _active.set(alias)
+    try:
+        yield alias
+    finally:
+        _active.reset(token)
+
+
+def fan_out(func, aliases=None, max_workers=None):
+    """Run ``func(alias)`` once per shard, concurrently, inside ``use_shard(alias)``.
+
+    Returns ``{alias: result}`` in shard order.
+    """
+    aliases = list(aliases or shards())
+
+    def run(alias):
+        try:
+            with use_shard(alias):
+                return func(alias)
+        finally:
+            # Worker threads get their own connections; don't leak them
+            connections.close_all()
+
+    if len(aliases) == 1:
+        with use_shard(aliases[0]):
+            return {aliases[0]: func(aliases[0])}
+    with ThreadPoolExecutor(max_workers=max_workers or len(aliases)) as pool:
+        return dict(zip(aliases, pool.map(run, aliases)))
+
+
+def row_counts():
+    """``{alias: {model label: rows}}`` for every sharded model, counted on each shard in parallel"""
+    def count(alias):
+        return {label: apps.get_model(label)._base_manager.using(alias).count()
+                for label, _ in SHARDED_MODELS}
+    return fan_out(count)
+
+
+def _instance_shard(obj):
+    label = obj._meta.label_lower
+    if label == "api.user":
+        return obj.shard or None
+    if label not in SHARDED_LABELS:
+        return None
+    if obj._state.db:
+        return obj._state.db
+    user_id = getattr(obj, "user_id", None)
+    return shard_for_user(user_id) if user_id else None
+
+
+class ShardRouter:
+    """Send sharded models to their owner's shard; everything else stays on ``default``"""
+
+    def _db_for(self, model, **hints):
+        if model._meta.label_lower not in SHARDED_LABELS or not is_sharded():
+            return None
+        instance = hints.get("instance")
+        if instance is not None:
+            alias = _instance_shard(instance)
+            if alias:
+                return alias
+        return active_db()
+
+    db_for_read = _db_for
+    db_for_write = _db_for
+
+    def allow_relation(self, obj1, obj2, **hints):
+        labels = {obj1._meta.label_lower, obj2._meta.label_lower}
+        if not labels <= SHARDED_LABELS | {"api.user"}:
+            return None
+        shard1, shard2 = _instance_shard(obj1), _instance_shard(obj2)
+        return shard1 is None or shard2 is None or shard1 == shard2
+
+
+def mirror_user(user, alias):
+    """Create or refresh the stub user row on ``alias`` that shard-local foreign keys point to"""
+    User = apps.get_model("api", "User")
+    User.objects.using(alias).update_or_create(
+        pk=user.pk, defaults={"username": user.username, "email": user.email, "shard": alias})
+
+
+def move_user(user, target, batch_size=1000):
+    """Copy every row owned by ``user`` to ``target``, repoint the shard map, then delete the source rows.
+
+    Money rows are locked on the source first, so concurrent writes wait for the cut-over.
+    Returns the number of rows moved.
+    """
+    User = apps.get_model("api", "User")
+    source = shard_for_user(user)
+    if source == target:
+        return 0
+
+    moved = 0
+    with transaction.atomic(using=source), transaction.atomic(using=target):
+        for label in ("api.mainaccount", "api.project"):
+            list(apps.get_model(label)._base_manager.using(source)
+                 .select_for_update().filter(user_id=user.pk).values_list("pk", flat=True))
+        if target != DEFAULT_DB:
+            mirror_user(user, target)
+
+        for label, lookup in SHARDED_MODELS:
+            model = apps.get_model(label)
+            rows = model._base_manager.using(source).filter(**{lookup: user.pk}).order_by("pk")
+            moved += _copy_rows(model, rows, target, batch_size)
+
+        User.objects.using(DEFAULT_DB).filter(pk=user.pk, shard=source).update(shard=target)
+
+        for label, lookup in reversed(SHARDED_MODELS):
+            apps.get_model(label)._base_manager.using(source).filter(**{lookup: user.pk}).delete()
+        if source != DEFAULT_DB:
+            User.objects.using(source).filter(pk=user.pk).delete()
+
+    user.shard = target
+    return moved
+
+
+def _copy_rows(model, rows, target, batch_size):
+    fields = model._meta.concrete_fields
+    manager = model._base_manager.using(target)
+    copied = 0
+    batch = []
+    for obj in rows.iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            copied += _insert_raw(manager, batch, fields, target)
+            batch = []
+    if batch:
+        copied += _insert_raw(manager, batch, fields, target)
+    return copied
+
+
+def _insert_raw(manager, objs, fields, using):
+    # raw=True writes stored values as-is (like loaddata), so auto_now/auto_now_add
+    # timestamps survive the move; bulk_create would reset them
+    manager._insert(objs, fields=fields, raw=True, using=using)
+    return len(objs)
+
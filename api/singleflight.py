@@ -0,0 +1,95 @@
+"""
+Single-flight: concurrent calls with the same key share one execution.
+
+The first caller for a key runs the function; callers arriving while it runs wait for
+it and get the same result (or exception) instead of repeating the work. Once it
+returns, the key is free again: nothing is cached beyond the in-flight call.
+
+Within a process this is a lock and an event per key. With a cache alias, callers in
+other processes coordinate through that cache: the leader holds ``cache.add()`` lock
+and publishes its result for a few seconds, waiters poll for it. The cache must be
+shared between processes (Redis, Memcached, database), not ``LocMemCache``.
+"""
+import hashlib
+import threading
+import time
+
+from django.core.cache import caches
+
+RESULT_TTL = 10  # Seconds a published result stays readable by cross-process waiters
+POLL_INTERVAL = 0.05
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+_group = Group()
+_MISSING = object()
+
+
+def do(key, func, cache_alias=None, timeout=30):
+    """``func()``, shared with concurrent calls for ``key`` (hashable, with a stable ``repr``).
+
+    With ``cache_alias``, also shared across processes; a waiter gives up after
+    ``timeout`` seconds and computes the result itself.
+    """
+    if cache_alias:
+        return _group.do(key, lambda: _across_processes(key, func, caches[cache_alias], timeout))
+    return _group.do(key, func)
+
+
+def _across_processes(key, func, cache, timeout):
+    digest = hashlib.sha256(repr(key).encode()).hexdigest()
+    lock_key, result_key = f"singleflight:lock:{digest}", f"singleflight:result:{digest}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cache.add(lock_key, 1, timeout):
+            try:
+                result = func()
+                cache.set(result_key, result, RESULT_TTL)
+                return result
+            finally:
+                cache.delete(lock_key)
+        # Another process is computing it: wait for its result, or for the lock to go
+        # (it failed) and try to take over
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            result = cache.get(result_key, _MISSING)
+            if result is not _MISSING:
+                return result
+            if cache.get(lock_key) is None:
+                break
+    return func()
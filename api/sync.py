@@ -0,0 +1,122 @@
+"""
+Delta sync for offline clients: rows changed since an opaque cursor, plus tombstones
+for deleted rows.
+
+The cursor holds one ``(change time, pk)`` keyset position per collection, so each
+collection pages independently. Positions are never moved past ``now - SYNC_LAG``:
+rows committed slightly out of timestamp order are re-sent once rather than missed
+(clients upsert by id, so repeats are harmless).
+"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BudgetAlert, Category, Expense, Project, SyncTombstone, Transaction
+from .serializers import (BudgetAlertSerializer, CategorySerializer, ExpenseSerializer,
+                          ProjectSerializer, TransactionSerializer)
+
+# collection -> (model, change-time field, lookup of the owning user, serialize(queryset))
+COLLECTIONS = {
+    "projects": (Project, "updated_at", "user",
+                 lambda qs: ProjectSerializer(qs.with_budget_status(), many=True).data),
+    "categories": (Category, "updated_at", "user",
+                   lambda qs: CategorySerializer(qs, many=True).data),
+    "expenses": (Expense, "updated_at", "project__user", ExpenseSerializer.fast_data),
+    # Append-only: a transaction's timestamp is its only change
+    "transactions": (Transaction, "timestamp", "user", TransactionSerializer.fast_data),
+    "budget_alerts": (BudgetAlert, "updated_at", "user",
+                      lambda qs: BudgetAlertSerializer(qs.select_related("project"), many=True).data),
+}
+DELETED = "deleted"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(positions):
+    payload = {key: [ts.isoformat(), str(pk) if pk else None] for key, (ts, pk) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        positions = {key: (datetime.fromisoformat(ts), uuid.UUID(pk) if pk else None)
+                     for key, (ts, pk) in payload.items() if key in COLLECTIONS or key == DELETED}
+    except (ValueError, TypeError, AttributeError, binascii.Error) as e:
+        raise InvalidCursor(str(e)) from e
+    # Positions are compared with aware timestamps; encode_cursor() always writes the offset
+    if any(timezone.is_naive(ts) for ts, _ in positions.values()):
+        raise InvalidCursor("Cursor timestamps must include a UTC offset")
+    return positions
+
+
+def _after(field, position):
+    if position is None:
+        return Q()
+    ts, pk = position
+    if pk is None:
+        return Q(**{f"{field}__gte": ts})
+    return Q(**{f"{field}__gt": ts}) | Q(**{field: ts, "pk__gt": pk})
+
+
+def _page(queryset, field, position, limit, safe_until):
+    """Keys of the next page and the position to resume from"""
+    keys = list(queryset.filter(_after(field, position)).order_by(field, "pk")
+                .values_list(field, "pk")[:limit + 1])
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+    if has_more:
+        return keys, keys[-1], True
+    return keys, (safe_until, None), False
+
+
+def changes(user, cursor=None, limit=500):
+    """One page of changes for ``user`` since ``cursor`` (None: full sync)"""
+    now = timezone.now()
+    safe_until = now - timedelta(seconds=getattr(settings, "SYNC_LAG", 5))
+    horizon = now - timedelta(days=getattr(settings, "SYNC_TOMBSTONE_DAYS", 90))
+
+    positions = decode_cursor(cursor) if cursor else {}
+    # Tombstones older than the horizon may be pruned: such a client must start over
+    full = DELETED not in positions or positions[DELETED][0] < horizon
+    if full:
+        positions = {DELETED: (now, None)}
+
+    data, next_positions, has_more = {}, {}, False
+    for key, (model, field, owner, serialize) in COLLECTIONS.items():
+        queryset = model.objects.filter(**{owner: user})
+        keys, next_positions[key], more = _page(queryset, field, positions.get(key), limit, safe_until)
+        has_more |= more
+        pks = [pk for _, pk in keys]
+        data[key] = serialize(queryset.filter(pk__in=pks).order_by(field, "pk")) if pks else []
+
+    tombstones = SyncTombstone.objects.filter(user=user)
+    keys, next_positions[DELETED], more = _page(
+        tombstones, "deleted_at", positions.get(DELETED), limit, safe_until)
+    has_more |= more
+    deleted = {key: [] for key in COLLECTIONS}
+    if keys:
+        for collection, object_id in tombstones.filter(
+                pk__in=[pk for _, pk in keys]).order_by("deleted_at", "pk").values_list("collection", "object_id"):
+            deleted.setdefault(collection, []).append(object_id)
+
+    return {
+        "cursor": encode_cursor(next_positions),
+        "full": full,
+        "has_more": has_more,
+        "changes": data,
+        "deleted": deleted,
+    }
+
+
+def prune_tombstones(older_than_days=None):
+    days = older_than_days or getattr(settings, "SYNC_TOMBSTONE_DAYS", 90)
+    return SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()[0]
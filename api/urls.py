@@ -1,8 +1,11 @@
-from django.urls import path
+from django.urls import path, re_path
 from .views import (UserMainAccountView, UserSignupView, UserLoginView, ProjectListCreateView, 
                    ProjectDetailView, AllocateFundsView, UserCreateView, AddExpenseView, 
                    ProjectBalanceView, TransactionHistoryView, CategoryListCreateView,
-                   ProjectTransferView, BudgetAlertsView, ReportingView, ExpenseListView)
+                   ProjectTransferView, BudgetAlertsView, ReportingView, ExpenseListView,
+                   BalanceAsOfView, BatchAllocateFundsView, BatchProjectTransferView, event_stream,
+                   SyncView, RecurringScheduleListCreateView, RecurringScheduleDetailView,
+                   ReceiptListCreateView, ReceiptView)
 from api.views import AddFundsView
 
 urlpatterns = [
@@ -14,6 +17,7 @@ urlpatterns = [
     # Account Management
     path('my-main-account/', UserMainAccountView.as_view(), name='my-main-account'),
     path('add-funds/', AddFundsView.as_view(), name='add-funds'),
+    path('balance/', BalanceAsOfView.as_view(), name='balance-as-of'),
     
     # Project Management
     path('projects/', ProjectListCreateView.as_view(), name='project-list'),
@@ -22,11 +26,17 @@ urlpatterns = [
     
     # Fund Operations
     path('allocate-funds/', AllocateFundsView.as_view(), name='allocate-funds'),
+    path('allocate-funds/batch/', BatchAllocateFundsView.as_view(), name='allocate-funds-batch'),
     path('transfer-funds/', ProjectTransferView.as_view(), name='transfer-funds'),  # 🆕 NEW
+    path('transfer-funds/batch/', BatchProjectTransferView.as_view(), name='transfer-funds-batch'),
     
     # Expense Management
     path('add-expense/', AddExpenseView.as_view(), name='add-expense'),
     path('expenses/', ExpenseListView.as_view(), name='expense-list'),  # 🆕 NEW
+    path('recurring/', RecurringScheduleListCreateView.as_view(), name='recurring-list'),
+    path('recurring/<uuid:pk>/', RecurringScheduleDetailView.as_view(), name='recurring-detail'),
+    path('receipts/', ReceiptListCreateView.as_view(), name='receipt-list'),
+    re_path(r'^receipts/(?P<sha256>[0-9a-f]{64})/$', ReceiptView.as_view(), name='receipt-detail'),
     
     # Categories
     path('categories/', CategoryListCreateView.as_view(), name='category-list'),  # 🆕 NEW
@@ -36,5 +46,7 @@ urlpatterns = [
     path('budget-alerts/', BudgetAlertsView.as_view(), name='budget-alerts'),
     path('budget-alerts/<uuid:alert_id>/', BudgetAlertsView.as_view(), name='budget-alert-detail'),
     path('reports/', ReportingView.as_view(), name='reports'),
+    path('events/', event_stream, name='event-stream'),
+    path('sync/', SyncView.as_view(), name='sync'),
 
 ]
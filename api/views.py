@@ -9,17 +9,31 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from .serializers import (UserSignupSerializer, ProjectSerializer, FundAllocationSerializer, 
                          UserSerializer, MainAccountSerializer, ExpenseSerializer, CategorySerializer,
-                         TransactionSerializer, BudgetAlertSerializer, ProjectTransferSerializer)
-from .models import Project, MainAccount, Expense, Category, Transaction, BudgetAlert
+                         TransactionSerializer, BudgetAlertSerializer, ProjectTransferSerializer,
+                         BatchFundAllocationSerializer, BatchProjectTransferSerializer,
+                         BudgetAlertBulkReadSerializer, RecurringScheduleSerializer, ReceiptSerializer)
+from .models import (Project, ProjectQuerySet, MainAccount, Expense, Category, Transaction, BudgetAlert,
+                     AlertCounter, DataVersion, RecurringSchedule, Receipt)
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
 from django.views import View
+from django.conf import settings
 from decimal import Decimal
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Sum, Count
+from django.db import transaction
+from django.db.models import F, Prefetch, Q, Sum, Count
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import content_disposition_header
+from datetime import datetime, time, timedelta
 import uuid
+from . import analytics, archive, events, fx, ledger, receipts, sharding, singleflight, sync
+from .authentication import stream_user
+from .conditional import ConditionalGetMixin
+from .pagination import StandardPagination
+from rest_framework.exceptions import ValidationError
 
 
 User = get_user_model()
@@ -36,7 +50,7 @@ class UserSignupView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserMainAccountView(APIView):
+class UserMainAccountView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -48,9 +62,58 @@ class UserMainAccountView(APIView):
             return Response({"error": "Main account not found"}, status=status.HTTP_404_NOT_FOUND)
 
 
-class ProjectListCreateView(generics.ListCreateAPIView):
-    queryset = Project.objects.all()
+PROJECT_ORDERING_FIELDS = {'name': 'name', 'budget': 'budget', 'budget_limit': 'budget_limit',
+                           'created_at': 'created_at', 'total_spent': 'total_spent', 'status': 'status_rank'}
+
+
+def filter_projects(projects, params, default_ordering='created_at'):
+    """Apply ?status=critical[,low], ?low_budget= and ?ordering=<field>[,-<field>] in SQL.
+
+    Budget status comes from ProjectQuerySet.with_budget_status(); ``status`` sorts by severity.
+    """
+    projects = projects.with_budget_status()
+    
+    statuses = params.get('status')
+    if statuses:
+        statuses = [value.strip() for value in statuses.split(',')]
+        if not set(statuses) <= set(ProjectQuerySet.BUDGET_STATUSES):
+            raise ValidationError({"status": f"Choose from {', '.join(ProjectQuerySet.BUDGET_STATUSES)}."})
+        projects = projects.filter(status__in=statuses)
+    low_budget = params.get('low_budget')
+    if low_budget is not None:
+        projects = projects.filter(budget_low=low_budget.lower() == 'true')
+    
+    ordering = []
+    for name in params.get('ordering', default_ordering).split(','):
+        name = name.strip()
+        field = PROJECT_ORDERING_FIELDS.get(name.lstrip('-'))
+        if field is None:
+            raise ValidationError({"ordering": f"Choose from {', '.join(PROJECT_ORDERING_FIELDS)}."})
+        ordering.append(f"-{field}" if name.startswith('-') else field)
+    # pk as tie-breaker keeps pages stable
+    return projects.order_by(*ordering, 'pk')
+
+
+class ProjectListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
+    """The user's projects; paginated, filtered and ordered by filter_projects()"""
+    permission_classes = [IsAuthenticated]
     serializer_class = ProjectSerializer
+    pagination_class = StandardPagination
+
+    def get_queryset(self):
+        return filter_projects(Project.objects.filter(user=self.request.user), self.request.query_params)
+
+    def perform_create(self, serializer):
+        # New projects default to the main account's currency
+        if 'currency' not in serializer.validated_data:
+            currency = MainAccount.objects.filter(user=self.request.user).values_list('currency', flat=True).first()
+            serializer.validated_data['currency'] = currency or settings.DEFAULT_CURRENCY
+        # An opening budget is recorded in the ledger, so reconciliation and balance lookups see it
+        budget = serializer.validated_data.get('budget') or Decimal('0.00')
+        with transaction.atomic(using=sharding.active_db()):
+            project = serializer.save(user=self.request.user, total_allocated=budget)
+            if budget:
+                ledger.record_budget_adjustment(project, budget, f"Opening budget for {project.name}")
 
 
 class UserCreateView(generics.CreateAPIView):
@@ -59,9 +122,36 @@ class UserCreateView(generics.CreateAPIView):
 
 
 class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Project.objects.all()
+    permission_classes = [IsAuthenticated]
     serializer_class = ProjectSerializer
 
+    def get_queryset(self):
+        return Project.objects.filter(user=self.request.user)
+
+    def perform_update(self, serializer):
+        with transaction.atomic(using=sharding.active_db()):
+            # Allocations and expenses move these concurrently: save what is current, not what was read
+            current = Project.objects.select_for_update().values(
+                'budget', 'total_spent', 'total_allocated', 'expense_count').get(pk=serializer.instance.pk)
+            for field, value in current.items():
+                setattr(serializer.instance, field, value)
+            change = serializer.validated_data.get('budget', current['budget']) - current['budget']
+            if not change:
+                serializer.save()
+                return
+            project = serializer.save(total_allocated=current['total_allocated'] + change)
+            ledger.record_budget_adjustment(
+                project, change, f"Budget of {project.name} set from {current['budget']} to {project.budget}")
+
+    def perform_destroy(self, instance):
+        # The project's alerts are cascade-deleted; take them off the owner's counters
+        with transaction.atomic(using=sharding.active_db()):
+            counts = instance.alerts.aggregate(
+                total=Count('id'), unread=Count('id', filter=Q(is_read=False)))
+            instance.delete()
+            if counts['total']:
+                AlertCounter.adjust(instance.user, unread=-counts['unread'], total=-counts['total'])
+
 
 class AllocateFundsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -70,18 +160,24 @@ class AllocateFundsView(APIView):
         serializer = FundAllocationSerializer(data=request.data)
         if serializer.is_valid():
             try:
-                project = Project.objects.get(
-                    id=serializer.validated_data['project_id'], user=request.user)
-                main_account = MainAccount.objects.get(user=request.user)
-
                 amount = serializer.validated_data['amount']
-                
-                if main_account.balance >= amount:
-                    # Update balances
-                    main_account.balance -= amount
-                    project.budget += amount
-                    main_account.save()
-                    project.save()
+
+                with transaction.atomic(using=sharding.active_db()):
+                    project = Project.objects.get(
+                        id=serializer.validated_data['project_id'], user=request.user)
+                    main_account = MainAccount.objects.get(user=request.user)
+                    # The project is credited in its own currency
+                    received = fx.convert(amount, main_account.currency, project.currency)
+
+                    # Conditional decrement: a concurrent allocation can't overdraw the account
+                    if not MainAccount.objects.filter(pk=main_account.pk, balance__gte=amount).update(
+                            balance=F('balance') - amount):
+                        return Response({"error": "Insufficient funds"}, status=status.HTTP_400_BAD_REQUEST)
+
+                    Project.objects.filter(pk=project.pk).update(
+                        budget=F('budget') + received,
+                        total_allocated=F('total_allocated') + received
+                    )
                     
                     # Create transaction record
                     Transaction.objects.create(
@@ -90,16 +186,89 @@ class AllocateFundsView(APIView):
                         main_account=main_account,
                         transaction_type="allocate",
                         amount=amount,
+                        currency=main_account.currency,
+                        counter_amount=received if project.currency != main_account.currency else None,
                         description=f"Allocated funds to {project.name}"
                     )
                     
-                    return Response({"message": "Funds allocated successfully"}, status=status.HTTP_200_OK)
-                return Response({"error": "Insufficient funds"}, status=status.HTTP_400_BAD_REQUEST)
+                return Response({"message": "Funds allocated successfully"}, status=status.HTTP_200_OK)
             except Project.DoesNotExist:
                 return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
+            except fx.MissingRate as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BatchAllocateFundsView(APIView):
+    """Fund many projects from the main account in one atomic request"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchFundAllocationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Repeated project ids are merged into one increment
+        amounts = {}
+        for allocation in serializer.validated_data['allocations']:
+            amounts[allocation['project_id']] = amounts.get(allocation['project_id'], 0) + allocation['amount']
+        total = sum(amounts.values())
+
+        projects = {p.id: p for p in Project.objects.filter(user=request.user, id__in=amounts)}
+        missing = [str(pk) for pk in amounts if pk not in projects]
+        if missing:
+            return Response({"error": "Project not found", "project_ids": missing},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        reference_id = str(uuid.uuid4())
+        with transaction.atomic(using=sharding.active_db()):
+            main_account = MainAccount.objects.get(user=request.user)
+            # Each project is credited in its own currency, at today's rates from one query
+            today = timezone.localdate()
+            try:
+                rates = fx.Rates({main_account.currency} | {p.currency for p in projects.values()}, today, today)
+                received = {pk: rates.convert(amount, main_account.currency, projects[pk].currency, today)
+                            for pk, amount in amounts.items()}
+            except fx.MissingRate as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            # One conditional decrement validates the whole batch against the balance
+            if not MainAccount.objects.filter(pk=main_account.pk, balance__gte=total).update(
+                    balance=F('balance') - total):
+                return Response({"error": "Insufficient funds"}, status=status.HTTP_400_BAD_REQUEST)
+
+            increment = ledger.amount_by_pk(received)
+            Project.objects.filter(pk__in=amounts).update(
+                budget=F('budget') + increment,
+                total_allocated=F('total_allocated') + increment
+            )
+
+            Transaction.objects.bulk_create([
+                Transaction(
+                    user=request.user,
+                    project=projects[pk],
+                    main_account=main_account,
+                    transaction_type="allocate",
+                    amount=amount,
+                    currency=main_account.currency,
+                    counter_amount=received[pk] if projects[pk].currency != main_account.currency else None,
+                    description=f"Allocated funds to {projects[pk].name}",
+                    reference_id=reference_id
+                )
+                for pk, amount in amounts.items()
+            ])
+
+        return Response({
+            "message": "Funds allocated successfully",
+            "reference_id": reference_id,
+            "total_amount": total,
+            "allocations": [
+                {"project_id": pk, "project_name": projects[pk].name, "amount": amount}
+                for pk, amount in amounts.items()
+            ]
+        }, status=status.HTTP_200_OK)
+
+
 class UserLoginView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -123,21 +292,24 @@ class AddFundsView(APIView):
     def post(self, request):
         amount = request.data.get("amount")
         try:
-            main_account = MainAccount.objects.get(user=request.user)
             amount_decimal = Decimal(str(amount))
-            main_account.balance += amount_decimal
-            main_account.save()
-            
-            # Create transaction record
-            Transaction.objects.create(
-                user=request.user,
-                main_account=main_account,
-                transaction_type="deposit",
-                amount=amount_decimal,
-                description="Deposit to main account"
-            )
+            with transaction.atomic(using=sharding.active_db()):
+                main_account = MainAccount.objects.get(user=request.user)
+                # Increment in SQL: saving the instance would undo concurrent allocations
+                MainAccount.objects.filter(pk=main_account.pk).update(balance=F('balance') + amount_decimal)
+
+                # Create transaction record
+                Transaction.objects.create(
+                    user=request.user,
+                    main_account=main_account,
+                    transaction_type="deposit",
+                    amount=amount_decimal,
+                    currency=main_account.currency,
+                    description="Deposit to main account"
+                )
+                balance = MainAccount.objects.values_list('balance', flat=True).get(pk=main_account.pk)
             
-            return Response({"message": "Funds added successfully!", "balance": main_account.balance}, status=status.HTTP_200_OK)
+            return Response({"message": "Funds added successfully!", "balance": balance}, status=status.HTTP_200_OK)
         except MainAccount.DoesNotExist:
             return Response({"error": "Main account not found!"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -146,19 +318,28 @@ class AddExpenseView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        serializer = ExpenseSerializer(data=request.data)
+        serializer = ExpenseSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             try:
                 project = Project.objects.get(
                     id=serializer.validated_data["project"].id, user=request.user)
 
                 amount = serializer.validated_data["amount"]
+                # Paid in another currency: the budget is charged the converted amount
+                currency = serializer.validated_data.get("currency", project.currency)
+                original_amount = None
+                if currency != project.currency:
+                    original_amount, amount = amount, fx.convert(amount, currency, project.currency)
                 
-                if project.budget >= amount:
-                    project.budget -= amount
-                    project.save()
+                with transaction.atomic(using=sharding.active_db()):
+                    # Conditional decrement keeps budget and counters in step under concurrency
+                    if not Project.objects.filter(pk=project.pk, budget__gte=amount).update(
+                            budget=F('budget') - amount,
+                            total_spent=F('total_spent') + amount,
+                            expense_count=F('expense_count') + 1):
+                        return Response({"error": "Insufficient project budget"}, status=status.HTTP_400_BAD_REQUEST)
 
-                    expense = serializer.save()
+                    expense = serializer.save(amount=amount, currency=currency, original_amount=original_amount)
                     
                     # Create transaction record
                     main_account = MainAccount.objects.get(user=request.user)
@@ -168,69 +349,74 @@ class AddExpenseView(APIView):
                         main_account=main_account,
                         transaction_type="expense",
                         amount=amount,
+                        currency=project.currency,
                         description=f"Expense: {expense.description}"
                     )
                     
-                    # Check for budget alerts
-                    self._check_budget_alerts(request.user, project)
-                    
-                    return Response({"message": "Expense added successfully"}, status=status.HTTP_201_CREATED)
-                return Response({"error": "Insufficient project budget"}, status=status.HTTP_400_BAD_REQUEST)
+                # Check for budget alerts
+                project.refresh_from_db(fields=['budget'])
+                self._check_budget_alerts(request.user, project)
+                
+                return Response({"message": "Expense added successfully"}, status=status.HTTP_201_CREATED)
             except Project.DoesNotExist:
                 return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
+            except fx.MissingRate as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def _check_budget_alerts(self, user, project):
         """Check and create budget alerts if needed"""
-        if project.is_budget_low():
-            BudgetAlert.objects.get_or_create(
+        created_count = 0
+        for alert_type, message in project.budget_alerts_due():
+            _, created = BudgetAlert.objects.get_or_create(
                 user=user,
                 project=project,
-                alert_type="low_budget",
-                defaults={
-                    "message": f"Project '{project.name}' budget is running low (${project.budget} remaining)"
-                }
+                alert_type=alert_type,
+                defaults={"message": message}
             )
+            created_count += created
         
-        if project.budget <= 0:
-            BudgetAlert.objects.get_or_create(
-                user=user,
-                project=project,
-                alert_type="no_funds",
-                defaults={
-                    "message": f"Project '{project.name}' has no remaining budget"
-                }
-            )
+        if created_count:
+            AlertCounter.adjust(user, unread=created_count, total=created_count)
 
 
-class ProjectBalanceView(APIView):
+class ProjectBalanceView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
         """Get detailed balance information for all user's projects"""
         try:
-            projects = Project.objects.filter(user=request.user).prefetch_related('expenses')
+            projects = filter_projects(
+                Project.objects.filter(user=request.user), request.query_params
+            ).prefetch_related(
+                # One windowed query for every project's latest 3 expenses
+                Prefetch('expenses',
+                         queryset=Expense.objects.select_related('project', 'category').order_by('-created_at')[:3],
+                         to_attr='latest_expenses')
+            )
             
-            if not projects.exists():
+            # Calculate summary statistics from the denormalized counters
+            summary = projects.aggregate(
+                total_projects=Count('id'),
+                total_remaining=Sum('budget'),
+                total_spent=Sum('total_spent'),
+            )
+            if not summary['total_projects']:
                 return Response({"message": "No projects found"}, status=status.HTTP_200_OK)
             
             # Import here to avoid circular import
             from .serializers import ProjectBalanceSerializer
             serializer = ProjectBalanceSerializer(projects, many=True)
             
-            # Calculate summary statistics
-            total_allocated = sum(project.budget for project in projects)
-            total_original_budget = sum(
-                project.budget + sum(expense.amount for expense in project.expenses.all()) 
-                for project in projects
-            )
-            total_spent = total_original_budget - total_allocated
+            total_allocated = summary['total_remaining']
+            total_spent = summary['total_spent']
+            total_original_budget = total_allocated + total_spent
             
             response_data = {
                 "projects": serializer.data,
                 "summary": {
-                    "total_projects": projects.count(),
+                    "total_projects": summary['total_projects'],
                     "total_original_budget": total_original_budget,
                     "total_spent": total_spent,
                     "total_remaining": total_allocated
@@ -239,23 +425,89 @@ class ProjectBalanceView(APIView):
             
             return Response(response_data, status=status.HTTP_200_OK)
             
+        except ValidationError:
+            raise
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BalanceAsOfView(APIView):
+    """Point-in-time balances: nearest checkpoint plus the transactions after it"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        as_of = self._parse_as_of(request.query_params.get('as_of'))
+        if as_of is None:
+            return Response({"error": "Invalid as_of date"}, status=status.HTTP_400_BAD_REQUEST)
+
+        main_account = ledger.annotate_main_account_balance(
+            MainAccount.objects.filter(user=request.user), as_of
+        ).values('balance_as_of', 'checkpoint_as_of').first()
+        if main_account is None:
+            return Response({"error": "Main account not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        projects = Project.objects.filter(user=request.user)
+        project_id = request.query_params.get('project_id')
+        if project_id:
+            projects = projects.filter(id=project_id)
+        projects = list(ledger.annotate_project_balance(projects, as_of).order_by('created_at')
+                        .values('id', 'name', 'balance_as_of', 'checkpoint_as_of'))
+
+        # Archived transactions between a checkpoint and as_of still count
+        archived_main, archived_projects = archive.replay(
+            request.user, as_of, main_account['checkpoint_as_of'],
+            {p['id']: p['checkpoint_as_of'] for p in projects})
+
+        return Response({
+            "as_of": as_of,
+            "main_account_balance": main_account['balance_as_of'] + archived_main,
+            "projects": [
+                {"id": p['id'], "name": p['name'], "balance": p['balance_as_of'] + archived_projects[p['id']]}
+                for p in projects
+            ]
+        })
+
+    def _parse_as_of(self, value):
+        """A date means end of that day; a naive datetime is in the current timezone"""
+        if not value:
+            return timezone.now()
+        try:
+            # Checked first: parse_datetime() also accepts a bare date, as midnight
+            day = parse_date(value)
+            if day is not None:
+                parsed = datetime.combine(day + timedelta(days=1), time.min)
+            else:
+                parsed = parse_datetime(value)
+                if parsed is None:
+                    return None
+        except ValueError:
+            return None
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+
 # 🆕 NEW FEATURE VIEWS
 
 class TransactionHistoryView(APIView):
     """🆕 Transaction History: View all transactions for audit trail"""
     permission_classes = [IsAuthenticated]
+    summary_keys = {'deposit': 'total_deposits', 'expense': 'total_expenses',
+                    'allocate': 'total_allocations', 'transfer': 'total_transfers'}
     
     def get(self, request):
         # Get query parameters
         transaction_type = request.query_params.get('type')
         project_id = request.query_params.get('project_id')
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
+        start_date = self._parse_timestamp(request.query_params.get('start_date'))
+        end_date = self._parse_timestamp(request.query_params.get('end_date'))
         limit = int(request.query_params.get('limit', 50))
+        try:
+            project_id = uuid.UUID(project_id) if project_id else None
+        except ValueError:
+            return Response({"error": "Invalid project_id"}, status=status.HTTP_400_BAD_REQUEST)
+        if start_date is False or end_date is False:
+            return Response({"error": "Invalid start_date or end_date"}, status=status.HTTP_400_BAD_REQUEST)
         
         # Build query
         transactions = Transaction.objects.filter(user=request.user)
@@ -271,26 +523,61 @@ class TransactionHistoryView(APIView):
         if end_date:
             transactions = transactions.filter(timestamp__lte=end_date)
         
-        transactions = transactions.order_by('-timestamp')[:limit]
+        # Calculate summary over the filtered history in one query
+        summary = transactions.aggregate(
+            total_transactions=Count('id'),
+            total_deposits=Sum('amount', filter=Q(transaction_type='deposit')),
+            total_expenses=Sum('amount', filter=Q(transaction_type='expense')),
+            total_allocations=Sum('amount', filter=Q(transaction_type='allocate')),
+            total_transfers=Sum('amount', filter=Q(transaction_type='transfer')),
+        )
         
-        serializer = TransactionSerializer(transactions, many=True)
+        # values() fast path: names joined in SQL, no model instances
+        transactions = TransactionSerializer.fast_data(
+            transactions.order_by('-timestamp')[:limit], request)
         
-        # Calculate summary
-        total_deposits = transactions.filter(transaction_type='deposit').aggregate(Sum('amount'))['amount__sum'] or 0
-        total_expenses = transactions.filter(transaction_type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-        total_allocations = transactions.filter(transaction_type='allocate').aggregate(Sum('amount'))['amount__sum'] or 0
-        total_transfers = transactions.filter(transaction_type='transfer').aggregate(Sum('amount'))['amount__sum'] or 0
+        # Read-through: months moved to the archive by archive_transactions
+        archives = archive.archives_for(request.user, start_date, end_date)
+        if archives:
+            filters = {"transaction_type": transaction_type, "project_id": project_id,
+                       "start": start_date, "end": end_date}
+            for kind, (count, amount) in archive.summarize(archives, **filters).items():
+                summary['total_transactions'] += count
+                key = self.summary_keys.get(kind)
+                if key:
+                    summary[key] = (summary[key] or 0) + amount
+            if len(transactions) < limit:
+                # Archived months are all older than anything still in the database
+                transactions += TransactionSerializer.format_rows(
+                    archive.latest_rows(archives, limit - len(transactions), **filters), request)
         
         return Response({
-            "transactions": serializer.data,
+            "transactions": transactions,
             "summary": {
-                "total_transactions": transactions.count(),
-                "total_deposits": total_deposits,
-                "total_expenses": total_expenses,
-                "total_allocations": total_allocations,
-                "total_transfers": total_transfers
+                "total_transactions": summary['total_transactions'],
+                "total_deposits": summary['total_deposits'] or 0,
+                "total_expenses": summary['total_expenses'] or 0,
+                "total_allocations": summary['total_allocations'] or 0,
+                "total_transfers": summary['total_transfers'] or 0
             }
         })
+    
+    def _parse_timestamp(self, value):
+        """None when absent, False when unparseable; a bare date means midnight"""
+        if not value:
+            return None
+        try:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                day = parse_date(value)
+                if day is None:
+                    return False
+                parsed = datetime.combine(day, time.min)
+        except ValueError:
+            return False
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
 
 
 class CategoryListCreateView(APIView):
@@ -326,13 +613,18 @@ class ProjectTransferView(APIView):
                 amount = serializer.validated_data['amount']
                 description = serializer.validated_data.get('description', 
                     f"Transfer from {from_project.name} to {to_project.name}")
+                received = fx.convert(amount, from_project.currency, to_project.currency)
                 
-                if from_project.budget >= amount:
-                    # Update project budgets
-                    from_project.budget -= amount
-                    to_project.budget += amount
-                    from_project.save()
-                    to_project.save()
+                with transaction.atomic(using=sharding.active_db()):
+                    # Update project budgets; the source decrement is conditional so it can't go negative
+                    if not Project.objects.filter(pk=from_project.pk, budget__gte=amount).update(
+                            budget=F('budget') - amount,
+                            total_allocated=F('total_allocated') - amount):
+                        return Response({"error": "Insufficient funds in source project"}, 
+                                      status=status.HTTP_400_BAD_REQUEST)
+                    Project.objects.filter(pk=to_project.pk).update(
+                        budget=F('budget') + received,
+                        total_allocated=F('total_allocated') + received)
                     
                     # Create transaction records
                     main_account = MainAccount.objects.get(user=request.user)
@@ -345,33 +637,114 @@ class ProjectTransferView(APIView):
                         to_project=to_project,
                         transaction_type="transfer",
                         amount=amount,
+                        currency=from_project.currency,
+                        counter_amount=received if to_project.currency != from_project.currency else None,
                         description=description,
                         reference_id=reference_id
                     )
                     
-                    return Response({
-                        "message": "Funds transferred successfully",
-                        "from_project": from_project.name,
-                        "to_project": to_project.name,
-                        "amount": amount
-                    }, status=status.HTTP_200_OK)
-                
-                return Response({"error": "Insufficient funds in source project"}, 
-                              status=status.HTTP_400_BAD_REQUEST)
+                return Response({
+                    "message": "Funds transferred successfully",
+                    "from_project": from_project.name,
+                    "to_project": to_project.name,
+                    "amount": amount,
+                    "received_amount": received
+                }, status=status.HTTP_200_OK)
                 
             except Project.DoesNotExist:
                 return Response({"error": "One or both projects not found"}, 
                               status=status.HTTP_404_NOT_FOUND)
+            except fx.MissingRate as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class BudgetAlertsView(APIView):
+class BatchProjectTransferView(APIView):
+    """Move funds along many project-to-project legs, all or nothing"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchProjectTransferSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        legs = serializer.validated_data['transfers']
+        project_ids = {leg['from_project_id'] for leg in legs} | {leg['to_project_id'] for leg in legs}
+        projects = {p.id: p for p in Project.objects.filter(user=request.user, id__in=project_ids)}
+        missing = [str(pk) for pk in project_ids if pk not in projects]
+        if missing:
+            return Response({"error": "Project not found", "project_ids": missing},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        # Each leg credits the receiving project in its own currency
+        today = timezone.localdate()
+        try:
+            rates = fx.Rates({p.currency for p in projects.values()}, today, today)
+            for leg in legs:
+                leg['received'] = rates.convert(leg['amount'], projects[leg['from_project_id']].currency,
+                                                projects[leg['to_project_id']].currency, today)
+        except fx.MissingRate as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        net = {}
+        for leg in legs:
+            net[leg['from_project_id']] = net.get(leg['from_project_id'], 0) - leg['amount']
+            net[leg['to_project_id']] = net.get(leg['to_project_id'], 0) + leg['received']
+
+        reference_id = str(uuid.uuid4())
+        with transaction.atomic(using=sharding.active_db()):
+            # One update per touched project, in pk order so concurrent batches lock consistently.
+            # Only the net outflow has to be covered, not each leg on its own.
+            for pk in sorted(net):
+                amount = net[pk]
+                if amount == 0:
+                    continue
+                updated = Project.objects.filter(pk=pk, budget__gte=max(-amount, 0)).update(
+                    budget=F('budget') + amount,
+                    total_allocated=F('total_allocated') + amount
+                )
+                if not updated:
+                    transaction.set_rollback(True, using=sharding.active_db())
+                    return Response({"error": f"Insufficient funds in source project {projects[pk].name}",
+                                     "project_id": str(pk)}, status=status.HTTP_400_BAD_REQUEST)
+
+            main_account = MainAccount.objects.get(user=request.user)
+            Transaction.objects.bulk_create([
+                Transaction(
+                    user=request.user,
+                    main_account=main_account,
+                    from_project=projects[leg['from_project_id']],
+                    to_project=projects[leg['to_project_id']],
+                    transaction_type="transfer",
+                    amount=leg['amount'],
+                    currency=projects[leg['from_project_id']].currency,
+                    counter_amount=(leg['received'] if projects[leg['to_project_id']].currency
+                                    != projects[leg['from_project_id']].currency else None),
+                    description=leg.get('description',
+                        f"Transfer from {projects[leg['from_project_id']].name} to {projects[leg['to_project_id']].name}"),
+                    reference_id=reference_id
+                )
+                for leg in legs
+            ])
+
+        return Response({
+            "message": "Funds transferred successfully",
+            "reference_id": reference_id,
+            "transfer_count": len(legs),
+            "net_changes": [
+                {"project_id": pk, "project_name": projects[pk].name, "amount": amount}
+                for pk, amount in net.items()
+            ]
+        }, status=status.HTTP_200_OK)
+
+
+class BudgetAlertsView(ConditionalGetMixin, APIView):
     """🆕 Budget Monitoring: View and manage budget alerts"""
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        alerts = BudgetAlert.objects.filter(user=request.user)
+        alerts = BudgetAlert.objects.filter(user=request.user).select_related('project')
         unread_only = request.query_params.get('unread_only', 'false').lower() == 'true'
         
         if unread_only:
@@ -379,87 +752,164 @@ class BudgetAlertsView(APIView):
         
         serializer = BudgetAlertSerializer(alerts, many=True)
         
+        # Counts come from the per-user counter row instead of COUNT(*) queries
+        counter = AlertCounter.objects.filter(user=request.user).first() or AlertCounter.rebuild(request.user)
+        
         return Response({
             "alerts": serializer.data,
-            "unread_count": alerts.filter(is_read=False).count(),
-            "total_count": alerts.count()
+            "unread_count": counter.unread_count,
+            "total_count": counter.unread_count if unread_only else counter.total_count
         })
     
-    def patch(self, request, alert_id):
-        """Mark alert as read"""
-        try:
-            alert = BudgetAlert.objects.get(id=alert_id, user=request.user)
-            alert.is_read = True
-            alert.save()
-            return Response({"message": "Alert marked as read"})
-        except BudgetAlert.DoesNotExist:
-            return Response({"error": "Alert not found"}, status=status.HTTP_404_NOT_FOUND)
+    def patch(self, request, alert_id=None):
+        """Mark one alert as read, or many at once (by ids, project or created before a time)"""
+        if alert_id is None:
+            return self._bulk_mark_read(request)
+        with transaction.atomic(using=sharding.active_db()):
+            if not BudgetAlert.objects.filter(id=alert_id, user=request.user).exists():
+                return Response({"error": "Alert not found"}, status=status.HTTP_404_NOT_FOUND)
+            marked = BudgetAlert.objects.filter(id=alert_id, user=request.user, is_read=False).update(is_read=True)
+            if marked:
+                AlertCounter.adjust(request.user, unread=-marked)
+        return Response({"message": "Alert marked as read"})
+    
+    def _bulk_mark_read(self, request):
+        serializer = BudgetAlertBulkReadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        alerts = BudgetAlert.objects.filter(user=request.user, is_read=False)
+        if 'ids' in serializer.validated_data:
+            alerts = alerts.filter(id__in=serializer.validated_data['ids'])
+        if 'project_id' in serializer.validated_data:
+            alerts = alerts.filter(project_id=serializer.validated_data['project_id'])
+        if 'before' in serializer.validated_data:
+            alerts = alerts.filter(created_at__lt=serializer.validated_data['before'])
+        
+        # Single UPDATE; only rows that actually flipped are taken off the unread counter
+        with transaction.atomic(using=sharding.active_db()):
+            marked = alerts.update(is_read=True)
+            if marked:
+                AlertCounter.adjust(request.user, unread=-marked)
+        return Response({"message": f"{marked} alerts marked as read", "marked_count": marked})
 
 
 class ReportingView(APIView):
     """🆕 Reporting: Summary views of spending patterns"""
     permission_classes = [IsAuthenticated]
+    forecast_horizon_days = 10 * 366
     
     def get(self, request):
         report_type = request.query_params.get('type', 'overview')
-        period = request.query_params.get('period', '30')  # days
-        
         end_date = timezone.now()
-        start_date = end_date - timedelta(days=int(period))
+        try:
+            period = int(request.query_params.get('period', 30))  # days
+            start_date = end_date - timedelta(days=period)
+        except (ValueError, OverflowError):
+            period = 0
+        if period < 1:
+            return Response({"error": "Invalid period"}, status=status.HTTP_400_BAD_REQUEST)
         
-        if report_type == 'overview':
-            return self._get_overview_report(request.user, start_date, end_date)
-        elif report_type == 'categories':
-            return self._get_category_report(request.user, start_date, end_date)
-        elif report_type == 'projects':
-            return self._get_project_report(request.user, start_date, end_date)
-        elif report_type == 'trends':
-            return self._get_trends_report(request.user, start_date, end_date)
-        else:
-            return Response({"error": "Invalid report type"}, status=status.HTTP_400_BAD_REQUEST)
+        # Reporting currency: amounts in other currencies are converted per (currency, day)
+        currency = request.query_params.get('currency') or MainAccount.objects.filter(
+            user=request.user).values_list('currency', flat=True).first() or settings.DEFAULT_CURRENCY
+        if len(currency) != 3 or not currency.isalpha() or not currency.isupper():
+            return Response({"error": "Invalid currency"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Dashboards fire identical report requests at once: they share one computation.
+        # The data version keeps a request made after a write from joining an older one.
+        params = tuple(sorted((key, tuple(values)) for key, values in request.query_params.lists()
+                              if key not in ('type', 'period', 'currency')))
+        key = ("report", request.user.pk, DataVersion.current(request.user), report_type, period, currency, params)
+        data, code = singleflight.do(
+            key, lambda: self._report(request, report_type, start_date, end_date, currency),
+            cache_alias=settings.REPORT_SINGLE_FLIGHT_CACHE, timeout=settings.REPORT_SINGLE_FLIGHT_TIMEOUT)
+        return Response(data, status=code)
+    
+    def _report(self, request, report_type, start_date, end_date, currency):
+        """``(data, status)`` of the report: plain values the callers sharing it each wrap in a Response"""
+        response = self._dispatch_report(request, report_type, start_date, end_date, currency)
+        return response.data, response.status_code
+    
+    def _dispatch_report(self, request, report_type, start_date, end_date, currency):
+        try:
+            if report_type == 'overview':
+                return self._get_overview_report(request.user, start_date, end_date, currency)
+            elif report_type == 'categories':
+                return self._get_category_report(request.user, start_date, end_date, currency)
+            elif report_type == 'projects':
+                return self._get_project_report(request.user, start_date, end_date, request.query_params)
+            elif report_type == 'trends':
+                return self._get_trends_report(request.user, start_date, end_date, request.query_params, currency)
+            elif report_type == 'forecast':
+                return self._get_forecast_report(request.user, start_date, end_date)
+            else:
+                return Response({"error": "Invalid report type"}, status=status.HTTP_400_BAD_REQUEST)
+        except fx.MissingRate as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    def _get_overview_report(self, user, start_date, end_date):
+    def _get_overview_report(self, user, start_date, end_date, currency):
         # Basic financial overview
         main_account = MainAccount.objects.get(user=user)
-        projects = Project.objects.filter(user=user)
+        projects = Project.objects.filter(user=user).with_budget_status()
+        today = timezone.localdate(end_date)
         
-        total_expenses = Expense.objects.filter(
-            project__user=user, created_at__range=[start_date, end_date]
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        total_budget = sum(project.budget for project in projects)
+        # Budgets are current values (today's rate); expenses convert at their day's rate
+        budgets = [
+            {**row, 'day': today} for row in Project.objects.filter(user=user).values('currency').annotate(
+                total=Sum('budget'), count=Count('id')).order_by()
+        ]
+        budgets = fx.convert_totals(budgets, currency)
+        expenses = fx.convert_totals(
+            Expense.objects.filter(project__user=user, created_at__range=[start_date, end_date])
+            .values('project__currency', day=analytics.truncate('created_at', 'day'))
+            .annotate(total=Sum('amount')).order_by(),
+            currency, currency_key='project__currency')
         
         return Response({
             "period": f"{(end_date - start_date).days} days",
-            "main_account_balance": main_account.balance,
-            "total_project_budget": total_budget,
-            "total_expenses": total_expenses,
-            "projects_count": projects.count(),
-            "low_budget_projects": [p.name for p in projects if p.is_budget_low()]
+            "currency": currency,
+            "main_account_balance": fx.convert(main_account.balance, main_account.currency, currency, today),
+            "total_project_budget": sum((row['total'] for row in budgets), Decimal('0.00')),
+            "total_expenses": sum((row['total'] for row in expenses), Decimal('0.00')),
+            "projects_count": sum(row['count'] for row in budgets),
+            "low_budget_projects": list(
+                projects.filter(budget_low=True).order_by('created_at').values_list('name', flat=True)),
+            "critical_projects": list(
+                projects.filter(status='critical').order_by('created_at').values_list('name', flat=True))
         })
     
-    def _get_category_report(self, user, start_date, end_date):
-        # Spending by category
-        categories = Category.objects.filter(user=user).annotate(
-            period_expenses=Sum('expenses__amount', 
-                filter=Q(expenses__created_at__range=[start_date, end_date]))
-        ).filter(period_expenses__gt=0).order_by('-period_expenses')
+    def _get_category_report(self, user, start_date, end_date, currency):
+        # Spending by category: one grouped query, converted per (currency, day)
+        rows = fx.convert_totals(
+            Expense.objects.filter(
+                project__user=user, category__user=user, created_at__range=[start_date, end_date]
+            ).values('category_id', 'project__currency', day=analytics.truncate('created_at', 'day'))
+            .annotate(total=Sum('amount'), count=Count('id')).order_by(),
+            currency, currency_key='project__currency')
+        
+        totals = {}
+        for row in rows:
+            amount, count = totals.get(row['category_id'], (Decimal('0.00'), 0))
+            totals[row['category_id']] = (amount + row['total'], count + row['count'])
+        categories = Category.objects.filter(pk__in=totals).values('id', 'name', 'color')
         
         return Response({
-            "categories": [
+            "currency": currency,
+            "categories": sorted([
                 {
-                    "name": cat.name,
-                    "color": cat.color,
-                    "amount": cat.period_expenses or 0,
-                    "expense_count": cat.expenses.filter(created_at__range=[start_date, end_date]).count()
+                    "name": cat['name'],
+                    "color": cat['color'],
+                    "amount": totals[cat['id']][0],
+                    "expense_count": totals[cat['id']][1]
                 }
-                for cat in categories
-            ]
+                for cat in categories if totals[cat['id']][0] > 0
+            ], key=lambda cat: -cat['amount'])
         })
     
-    def _get_project_report(self, user, start_date, end_date):
-        # Project spending analysis
-        projects = Project.objects.filter(user=user).annotate(
+    def _get_project_report(self, user, start_date, end_date, params):
+        # Project spending analysis, filterable/sortable by budget status
+        projects = filter_projects(Project.objects.filter(user=user), params).annotate(
             period_expenses=Sum('expenses__amount',
                 filter=Q(expenses__created_at__range=[start_date, end_date]))
         )
@@ -468,31 +918,167 @@ class ReportingView(APIView):
             "projects": [
                 {
                     "name": project.name,
+                    "currency": project.currency,
                     "current_budget": project.budget,
                     "budget_limit": project.budget_limit,
                     "period_expenses": project.period_expenses or 0,
-                    "budget_status": project.budget_status(),
-                    "is_budget_low": project.is_budget_low()
+                    "budget_status": project.status,
+                    "is_budget_low": project.budget_low
                 }
                 for project in projects
             ]
         })
     
-    def _get_trends_report(self, user, start_date, end_date):
-        # Daily spending trends
-        daily_expenses = Expense.objects.filter(
-            project__user=user, created_at__range=[start_date, end_date]
-        ).extra(
-            select={'day': 'date(created_at)'}
-        ).values('day').annotate(
-            total=Sum('amount'), count=Count('id')
-        ).order_by('day')
-        
+    def _get_trends_report(self, user, start_date, end_date, params, currency):
+        # Spending trends bucketed by day/week/month, zero-filled over the whole period
+        granularity = params.get('granularity', 'day')
+        split = params.get('split')
+        if granularity not in analytics.GRANULARITIES:
+            return Response({"error": "Invalid granularity"}, status=status.HTTP_400_BAD_REQUEST)
+        if split not in (None, 'project', 'category'):
+            return Response({"error": "Invalid split"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            window = int(params.get('window', analytics.DEFAULT_WINDOWS[granularity]))
+        except ValueError:
+            window = 0
+        if window < 1:
+            return Response({"error": "Invalid window"}, status=status.HTTP_400_BAD_REQUEST)
+
+        buckets = analytics.bucket_range(
+            timezone.localdate(start_date), timezone.localdate(end_date), granularity)
+        index = {bucket: i for i, bucket in enumerate(buckets)}
+
+        # One grouped query; the split series and the overall series both come from it
+        group_by = {'project': ['project_id', 'project__name'],
+                    'category': ['category_id', 'category__name']}.get(split, [])
+        rows = self._bucketed_expenses(user, start_date, end_date, granularity, group_by, currency)
+
+        zero = Decimal('0.00')
+        totals, counts = [zero] * len(buckets), [0] * len(buckets)
+        series = {}
+        for row in rows:
+            i = index.get(row['period'])
+            if i is None:
+                continue
+            totals[i] += row['total']
+            counts[i] += row['count']
+            if split:
+                key = row[group_by[0]]
+                if key not in series:
+                    series[key] = {"name": row[group_by[1]] or "Uncategorized",
+                                   "totals": [zero] * len(buckets), "counts": [0] * len(buckets)}
+                series[key]["totals"][i] += row['total']
+                series[key]["counts"][i] += row['count']
+
+        def dense(bucket_totals, bucket_counts):
+            rolling = analytics.rolling_average(bucket_totals, window)
+            return [
+                {"period": bucket, "total": total, "count": count, "rolling_average": avg}
+                for bucket, total, count, avg in zip(buckets, bucket_totals, bucket_counts, rolling)
+            ]
+
+        trends = dense(totals, counts)
+        average = (sum(totals) / len(buckets)).quantize(analytics.CENTS) if buckets else zero
+        response = {
+            "currency": currency,
+            "granularity": granularity,
+            "window": window,
+            "trends": trends,
+            "average_spending": average,
+        }
+        if granularity == 'day':
+            # Kept for existing clients of the daily report
+            response["daily_trends"] = [
+                {"day": t["period"], "total": t["total"], "count": t["count"]} for t in trends]
+            response["average_daily_spending"] = average
+        if split:
+            response["split"] = split
+            response["series"] = [
+                {"id": key, "name": data["name"], "trends": dense(data["totals"], data["counts"])}
+                for key, data in series.items()
+            ]
+        return Response(response)
+    
+    def _get_forecast_report(self, user, start_date, end_date):
+        # Burn rate, trend and depletion date per project from the daily aggregation
+        today = timezone.localdate(end_date)
+        first_day = timezone.localdate(start_date)
+        n = (today - first_day).days + 1
+
+        # Running sums per project over the dense day index x = 0..n-1
+        sums = {}
+        for row in self._bucketed_expenses(user, start_date, end_date, 'day', ['project_id']):
+            x = (row['period'] - first_day).days
+            sum_y, sum_xy = sums.get(row['project_id'], (0, 0))
+            sums[row['project_id']] = (sum_y + row['total'], sum_xy + x * row['total'])
+
+        forecasts = []
+        for project in Project.objects.filter(user=user).values('id', 'name', 'budget', 'currency'):
+            sum_y, sum_xy = sums.get(project['id'], (Decimal(0), Decimal(0)))
+            intercept, slope = analytics.linear_trend(n, sum_y, sum_xy)
+            burn_rate = sum_y / n
+            projected_burn_rate = max(intercept + slope * n, Decimal(0))
+
+            if burn_rate == 0 or abs(slope * n) < burn_rate * Decimal('0.1'):
+                trend = "stable"
+            else:
+                trend = "increasing" if slope > 0 else "decreasing"
+
+            # Spending continues from the projected rate along the trend; no depletion
+            # date when it never runs out or only beyond the forecast horizon
+            days_remaining = depletion_date = None
+            days = analytics.days_until_spent(
+                project['budget'], projected_burn_rate, slope if trend != "stable" else Decimal(0))
+            if days is not None and days <= self.forecast_horizon_days:
+                days_remaining = int(days)
+                depletion_date = today + timedelta(days=days_remaining)
+
+            forecasts.append({
+                "id": project['id'],
+                "name": project['name'],
+                "currency": project['currency'],
+                "budget": project['budget'],
+                "burn_rate": burn_rate.quantize(analytics.CENTS),
+                "projected_burn_rate": projected_burn_rate.quantize(analytics.CENTS),
+                "trend": trend,
+                "days_remaining": days_remaining,
+                "depletion_date": depletion_date,
+            })
+
+        forecasts.sort(key=lambda f: (f["depletion_date"] is None, f["depletion_date"] or today))
         return Response({
-            "daily_trends": list(daily_expenses),
-            "average_daily_spending": sum(d['total'] for d in daily_expenses) / len(daily_expenses) if daily_expenses else 0
+            "period": f"{(end_date - start_date).days} days",
+            "forecasts": forecasts
         })
 
+    def _bucketed_expenses(self, user, start_date, end_date, granularity, group_by, currency=None):
+        """Expense totals and counts per time bucket (and ``group_by`` fields) in one query.
+
+        With ``currency``, rows are also grouped by project currency and day, converted,
+        then merged back into buckets.
+        """
+        expenses = Expense.objects.filter(project__user=user, created_at__range=[start_date, end_date])
+        if currency is None:
+            return expenses.annotate(
+                period=analytics.truncate('created_at', granularity)
+            ).values('period', *group_by).annotate(
+                total=Sum('amount'), count=Count('id')
+            ).order_by()
+
+        rows = fx.convert_totals(
+            expenses.values('project__currency', *group_by, day=analytics.truncate('created_at', 'day'))
+            .annotate(total=Sum('amount'), count=Count('id')).order_by(),
+            currency, currency_key='project__currency')
+        buckets = {}
+        for row in rows:
+            period = analytics.bucket_start(row['day'], granularity)
+            key = (period, *(row[field] for field in group_by))
+            bucket = buckets.setdefault(key, {'period': period, **{field: row[field] for field in group_by},
+                                              'total': Decimal('0.00'), 'count': 0})
+            bucket['total'] += row['total']
+            bucket['count'] += row['count']
+        return list(buckets.values())
+
 
 class ExpenseListView(APIView):
     """Enhanced expense list with filtering and categorization"""
@@ -516,7 +1102,134 @@ class ExpenseListView(APIView):
         if end_date:
             expenses = expenses.filter(created_at__lte=end_date)
         
-        expenses = expenses.order_by('-created_at')
-        serializer = ExpenseSerializer(expenses, many=True)
-        
-        return Response(serializer.data)
+        # values() fast path: names joined in SQL, no model instances
+        return Response(ExpenseSerializer.fast_data(expenses.order_by('-created_at'), request))
+
+
+class RecurringScheduleListCreateView(generics.ListCreateAPIView):
+    """Recurring expenses and allocations; posted by ``manage.py run_recurring_schedules``"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = RecurringScheduleSerializer
+    pagination_class = StandardPagination
+
+    def get_queryset(self):
+        return RecurringSchedule.objects.filter(user=self.request.user).select_related('project')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class RecurringScheduleDetailView(generics.RetrieveUpdateDestroyAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = RecurringScheduleSerializer
+
+    def get_queryset(self):
+        return RecurringSchedule.objects.filter(user=self.request.user).select_related('project')
+
+
+class ReceiptListCreateView(APIView):
+    """Upload receipts (streamed to disk, stored once per content hash) and list the user's"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        paginator = StandardPagination()
+        page = paginator.paginate_queryset(Receipt.objects.filter(user=request.user), request, view=self)
+        return paginator.get_paginated_response(ReceiptSerializer(page, many=True).data)
+
+    def post(self, request):
+        # Multipart uploads go through Django's upload handlers (large files spool to disk);
+        # anything else is the raw file, read from the request stream chunk by chunk
+        if request.content_type.startswith('multipart/form-data'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({"error": "Missing 'file'"}, status=status.HTTP_400_BAD_REQUEST)
+            chunks, content_type, filename = upload.chunks(receipts.CHUNK_SIZE), upload.content_type, upload.name
+        else:
+            chunks = receipts.read_stream(request.stream)
+            content_type = request.content_type.split(';')[0].strip()
+            filename = request.query_params.get('filename', '')
+        if content_type not in settings.RECEIPT_CONTENT_TYPES:
+            return Response({"error": "Unsupported receipt type", "allowed": settings.RECEIPT_CONTENT_TYPES},
+                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        try:
+            sha256, size, _ = receipts.store(chunks)
+        except receipts.TooLarge as e:
+            return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if size == 0:
+            return Response({"error": "Empty upload"}, status=status.HTTP_400_BAD_REQUEST)
+
+        receipt, created = Receipt.objects.get_or_create(
+            user=request.user, sha256=sha256,
+            defaults={"size": size, "content_type": content_type, "filename": filename[:255]})
+        return Response(ReceiptSerializer(receipt).data,
+                        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class ReceiptView(APIView):
+    """Serve one receipt with Range support; content under a hash never changes, so cache forever"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, sha256):
+        receipt = Receipt.objects.filter(user=request.user, sha256=sha256).first()
+        path = receipts.path_for(sha256)
+        if receipt is None or not path.exists():
+            return Response({"error": "Receipt not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = f'"{sha256}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            return self._cache_headers(response, etag)
+
+        byte_range = None
+        if request.headers.get('If-Range', etag) == etag:
+            try:
+                byte_range = receipts.parse_range(request.headers.get('Range'), receipt.size)
+            except ValueError:
+                response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                response['Content-Range'] = f"bytes */{receipt.size}"
+                return response
+
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=receipt.content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                receipts.iter_range(path, start, end), status=status.HTTP_206_PARTIAL_CONTENT,
+                content_type=receipt.content_type)
+            response['Content-Range'] = f"bytes {start}-{end}/{receipt.size}"
+            response['Content-Length'] = str(end - start + 1)
+        if receipt.filename:
+            response['Content-Disposition'] = content_disposition_header(False, receipt.filename)
+        return self._cache_headers(response, etag)
+
+    def _cache_headers(self, response, etag):
+        response['ETag'] = etag
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+
+
+class SyncView(ConditionalGetMixin, APIView):
+    """Delta sync for offline clients: rows changed or deleted since ?cursor="""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 500)), 1), 2000)
+            return Response(sync.changes(request.user, request.query_params.get('cursor'), limit))
+        except (ValueError, sync.InvalidCursor):
+            return Response({"error": "Invalid cursor or limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@require_GET
+async def event_stream(request):
+    """Server-Sent Events: ``balance`` and ``alert`` events as they happen (serve under ASGI)"""
+    user = await sync_to_async(stream_user)(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication credentials were not provided or are invalid"},
+                            status=status.HTTP_401_UNAUTHORIZED)
+    response = StreamingHttpResponse(events.stream(user), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Don't let nginx buffer the stream
+    return response
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Rendering benchmark for large list responses
+Compares DRF's JSONRenderer with FastJSONRenderer and measures bytes on the wire
+(raw, gzip, brotli) for ExpenseListView- and TransactionHistoryView-sized payloads.
+Needs no database or running server.
+"""
+
+import os
+import sys
+import time
+import uuid
+from decimal import Decimal
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_app.settings')
+import django
+django.setup()
+
+from django.utils import timezone
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from api.models import User, Project, Category, Expense, Transaction, MainAccount
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import ExpenseSerializer, TransactionSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_payloads(rows):
+    """Serializer output for unsaved model instances (no queries needed)"""
+    user = User(username="bench")
+    main_account = MainAccount(user=user, balance=Decimal("1000.00"))
+    projects = [Project(id=uuid.uuid4(), user=user, name=f"Project {i}") for i in range(10)]
+    category = Category(id=uuid.uuid4(), user=user, name="Food & Dining", color="#e74c3c")
+    now = timezone.now()
+
+    expenses = [
+        Expense(id=uuid.uuid4(), project=projects[i % 10], category=category,
+                amount=Decimal(f"{i % 500}.{i % 100:02d}"), description=f"Expense number {i}",
+                tags="food, household, essentials", created_at=now, updated_at=now)
+        for i in range(rows)
+    ]
+    transactions = [
+        Transaction(id=uuid.uuid4(), user=user, main_account=main_account,
+                    from_project=projects[i % 10], to_project=projects[(i + 1) % 10],
+                    transaction_type="transfer", amount=Decimal(f"{i % 500}.50"),
+                    description=f"Transfer {i}", reference_id=str(uuid.uuid4()), timestamp=now)
+        for i in range(rows)
+    ]
+    return {
+        "expenses": ExpenseSerializer(expenses, many=True).data,
+        "transactions": {
+            "transactions": TransactionSerializer(transactions, many=True).data,
+            # Summary values are raw Decimals, like TransactionHistoryView's aggregates
+            "summary": {"total_transfers": sum(t.amount for t in transactions)},
+        },
+    }
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = 5
+
+    print("⚡ RENDERING BENCHMARK")
+    print("=" * 60)
+    print(f"Rows per payload: {rows}, best of {repeat} runs")
+    print(f"orjson: {'installed' if orjson else 'not installed (FastJSONRenderer falls back to JSONRenderer)'}")
+    print(f"brotli: {'installed' if brotli else 'not installed'}")
+    print()
+
+    for name, data in build_payloads(rows).items():
+        baseline = JSONRenderer().render(data)
+        fast = FastJSONRenderer().render(data)
+        baseline_time = best_time(lambda: JSONRenderer().render(data), repeat)
+        fast_time = best_time(lambda: FastJSONRenderer().render(data), repeat)
+
+        print(f"📋 {name}")
+        print(f"   JSONRenderer:      {baseline_time * 1000:8.2f} ms")
+        print(f"   FastJSONRenderer:  {fast_time * 1000:8.2f} ms  ({baseline_time / fast_time:.1f}x)")
+        print(f"   identical output:  {baseline == fast}")
+        print(f"   raw bytes:         {len(fast):>10,}")
+        print(f"   gzip bytes:        {len(compress_string(fast)):>10,}")
+        if brotli:
+            print(f"   brotli bytes:      {len(brotli.compress(fast, quality=5)):>10,}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+List serialization benchmark: ModelSerializer vs the values() fast path
+Builds a throwaway test database, fills it with expenses and transactions, and
+times ExpenseListView- / TransactionHistoryView-style serialization both ways.
+Also checks that both paths render byte-identical JSON.
+"""
+
+import os
+import sys
+import time
+from decimal import Decimal
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_app.settings')
+import django
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+from api.models import User, MainAccount, Project, Category, Expense, Transaction
+from api.renderers import FastJSONRenderer
+from api.serializers import ExpenseSerializer, TransactionSerializer
+
+
+def seed(rows):
+    user = User.objects.create_user(username="bench", email="bench@example.com", password="bench")
+    main_account = MainAccount.objects.create(user=user, balance=Decimal("1000000.00"))
+    projects = [Project.objects.create(user=user, name=f"Project {i}") for i in range(10)]
+    categories = [Category.objects.create(user=user, name=f"Category {i}") for i in range(5)]
+
+    Expense.objects.bulk_create([
+        Expense(project=projects[i % 10], category=categories[i % 5] if i % 7 else None,
+                amount=Decimal(f"{i % 500}.{i % 100:02d}"), description=f"Expense number {i}",
+                tags="food, household" if i % 3 else "")
+        for i in range(rows)
+    ])
+    Transaction.objects.bulk_create([
+        Transaction(user=user, main_account=main_account, transaction_type="transfer",
+                    from_project=projects[i % 10], to_project=projects[(i + 1) % 10],
+                    amount=Decimal(f"{i % 500}.50"), description=f"Transfer {i}")
+        for i in range(rows)
+    ])
+    return user
+
+
+def best_time(func, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = 5
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = seed(rows)
+        cases = [
+            ("expenses", ExpenseSerializer,
+             lambda: Expense.objects.filter(project__user=user).order_by('-created_at'),
+             lambda qs: qs.select_related('project', 'category')),
+            ("transactions", TransactionSerializer,
+             lambda: Transaction.objects.filter(user=user).order_by('-timestamp'),
+             lambda qs: qs.select_related('project', 'from_project', 'to_project')),
+        ]
+
+        print("🚀 LIST SERIALIZATION BENCHMARK")
+        print("=" * 60)
+        print(f"Rows: {rows}, best of {repeat} runs (query + serialization)")
+        print()
+        renderer = FastJSONRenderer()
+        for name, serializer_class, queryset, joined in cases:
+            slow_time, slow = best_time(lambda: serializer_class(joined(queryset()), many=True).data, repeat)
+            fast_time, fast = best_time(lambda: serializer_class.fast_data(queryset()), repeat)
+
+            print(f"📋 {name}")
+            print(f"   ModelSerializer (select_related): {slow_time * 1000:8.1f} ms")
+            print(f"   values() fast path:               {fast_time * 1000:8.1f} ms  ({slow_time / fast_time:.1f}x)")
+            print(f"   byte-identical JSON:              {renderer.render(slow) == renderer.render(fast)}")
+            print()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
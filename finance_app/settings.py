@@ -24,10 +24,13 @@ INSTALLED_APPS = [
 # Middleware
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',  # Brotli/gzip for large responses
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ShardMiddleware',  # Resets the per-request shard selection
+    'api.middleware.DataVersionMiddleware',  # Bumps per-user ETag versions after writes
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,6 +78,18 @@ else:
         }
     }
 
+# Sharding: DB_SHARDS=N spreads user data over `default` plus shard_1..shard_{N-1}
+# (named <DB_NAME>_shard_<i> on PostgreSQL, db_shard_<i>.sqlite3 on SQLite)
+for i in range(1, int(os.getenv('DB_SHARDS', '1'))):
+    shard = dict(DATABASES['default'])
+    if shard['ENGINE'] == 'django.db.backends.sqlite3':
+        shard['NAME'] = BASE_DIR / f'db_shard_{i}.sqlite3'
+    else:
+        shard['NAME'] = f"{shard['NAME']}_shard_{i}"
+    DATABASES[f'shard_{i}'] = shard
+DATABASE_SHARDS = list(DATABASES)
+DATABASE_ROUTERS = ['api.sharding.ShardRouter']
+
 # Authentication
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -85,10 +100,54 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ShardedJWTAuthentication',
+    ),
+    # orjson-backed when installed, falls back to DRF's JSONRenderer otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = 1024
+
+# /api/events/ (SSE): keep-alive interval, and how often each process polls DataVersion
+# for writes made by other workers (0 disables polling: single-process deployments)
+EVENTS_HEARTBEAT = 15
+EVENTS_POLL_INTERVAL = 2
+
+# /api/sync/: cursors stay this many seconds behind now (late commits are re-sent, never
+# missed); deletions are remembered this many days, older cursors get a full resync
+SYNC_LAG = 5
+SYNC_TOMBSTONE_DAYS = 90
+
+# archive_transactions: months of transactions kept in the database, and where older ones go
+TRANSACTION_RETENTION_MONTHS = int(os.getenv('TRANSACTION_RETENTION_MONTHS', '24'))
+TRANSACTION_ARCHIVE_ROOT = os.getenv('TRANSACTION_ARCHIVE_ROOT', str(BASE_DIR / 'archive'))
+
+# Currency of new accounts; FxRate rows give the value of one unit of a currency in
+# FX_BASE_CURRENCY, loaded from CSV files in FX_RATES_DIR by `manage.py load_fx_rates`
+DEFAULT_CURRENCY = os.getenv('DEFAULT_CURRENCY', 'USD')
+FX_BASE_CURRENCY = os.getenv('FX_BASE_CURRENCY', DEFAULT_CURRENCY)
+FX_RATES_DIR = os.getenv('FX_RATES_DIR', str(BASE_DIR / 'fx_rates'))
+
+# /api/receipts/: content-addressed receipt files, upload size limit and accepted types
+RECEIPT_ROOT = os.getenv('RECEIPT_ROOT', str(BASE_DIR / 'receipts'))
+RECEIPT_MAX_SIZE = int(os.getenv('RECEIPT_MAX_SIZE', str(10 * 1024 * 1024)))
+RECEIPT_CONTENT_TYPES = ['image/jpeg', 'image/png', 'image/webp', 'image/heic', 'application/pdf']
+
+# Result counts (paginated API lists, admin changelists) estimated by PostgreSQL at this
+# many rows or more are reported as the estimate instead of running COUNT(*);
+# clients can still ask for ?exact_count=true
+APPROXIMATE_COUNT_THRESHOLD = int(os.getenv('APPROXIMATE_COUNT_THRESHOLD', '100000'))
+
+# /api/reports/: identical concurrent requests share one computation in each process;
+# naming a CACHES alias shared by all workers (Redis, Memcached) coalesces across
+# processes too. Waiters compute it themselves after REPORT_SINGLE_FLIGHT_TIMEOUT seconds
+REPORT_SINGLE_FLIGHT_CACHE = os.getenv('REPORT_SINGLE_FLIGHT_CACHE', '')
+REPORT_SINGLE_FLIGHT_TIMEOUT = 30
+
 
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'